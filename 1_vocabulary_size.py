@@ -10,9 +10,9 @@ Create plots of vocabulary size for three sample books
 import os, sys
 import numpy as np
 import matplotlib.pyplot as plt
-from div import Text, BestFit
+from div import Text, BestFit, Corpus, TokenCache
 import configparser
-import zipfile
+from functools import partial
 
 
 def load_params():
@@ -38,13 +38,14 @@ if __name__ == '__main__':
     markers = tuple(map(str.strip, params.get('markers').split(',')))
     markersize = int(params.get('markersize')) 
     interval_size = int(params.get('intervalsize')) 
+    cache_dir = params.get('cachedir')
+    cache = TokenCache(cache_dir) if cache_dir else None
     
     # main loop
-    archive = zipfile.ZipFile(archive_name, 'r')
-    for n, filename in enumerate(archive.namelist()):
-        content = archive.open(filename).read().decode('UTF-8')
-        text = Text(content)
-        stats = text.dict_size(interval_size)
+    corpus = Corpus(archive_name)
+    results = corpus.map(partial(Text.dict_size, step=interval_size), 
+                         encoded=True, cache=cache)
+    for n, (filename, stats) in enumerate(results):
         X = np.array(list(stats.keys()))
         Y = np.array(list(stats.values()))
         label = os.path.basename(filename).split('.')[0].replace('_', ' ')
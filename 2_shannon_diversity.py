@@ -10,9 +10,9 @@ Compute Shannon diversity index for sample books
 import os, sys
 import numpy as np
 import matplotlib.pyplot as plt
-from div import Text, BestFit
+from div import Text, BestFit, Corpus, TokenCache
 import configparser
-import zipfile
+from functools import partial
 
 def load_params():
     """
@@ -37,11 +37,12 @@ if __name__ == '__main__':
     markers = tuple(map(str.strip, params.get('markers').split(',')))
     markersize = int(params.get('markersize')) 
     interval_size = int(params.get('intervalsize')) 
-    archive = zipfile.ZipFile(archive_name, 'r')
-    for n, filename in enumerate(archive.namelist()):
-        content = archive.open(filename).read().decode('UTF-8')
-        text = Text(content) 
-        stats = text.token_diversity(interval_size)
+    cache_dir = params.get('cachedir')
+    cache = TokenCache(cache_dir) if cache_dir else None
+    corpus = Corpus(archive_name)
+    results = corpus.map(partial(Text.token_diversity, step=interval_size),
+                         encoded=True, cache=cache)
+    for n, (filename, stats) in enumerate(results):
         X = np.array(list(stats.keys()))
         Y = np.array(list(stats.values()))
         label = os.path.basename(filename).split('.')[0].replace('_', ' ')
@@ -10,9 +10,18 @@ Predict asympotic value for the diversity index of sample books
 import os, sys
 import numpy as np
 import matplotlib.pyplot as plt
-from div import Text, BestFit
+from div import BestFit, Corpus, TokenCache
 import configparser
-import zipfile
+from functools import partial
+
+def statistics(text, step):
+    """
+    Returns
+    -------
+    tuple
+        diversity curve, number of tokens and number of types in text.
+    """
+    return text.token_diversity(step), len(text), text.dict_size()
     
 """
   Main code
@@ -27,46 +36,41 @@ if __name__ == '__main__':
         archive_name  = config.get('LEXICAL', 'archive_name')
     interval_size = 4000
     step = 1000 # finer granularity for predictions
+    cache_dir = config.get('LEXICAL', 'cachedir', fallback=None)
+    cache = TokenCache(cache_dir) if cache_dir else None
     
     # main loop
     fig, subplot = plt.subplots(3, 1, sharey=True, figsize=(6, 10))
-    archive = zipfile.ZipFile(archive_name, 'r')
-    for n, filename in enumerate(archive.namelist()):
-        content = archive.open(filename).read().decode('UTF-8')
-        text = Text(content)
-        stats = text.token_diversity(step)
+    corpus = Corpus(archive_name)
+    results = corpus.map(partial(statistics, step=step), 
+                         encoded=True, cache=cache)
+    for n, (filename, (stats, num_tokens, num_types)) in enumerate(results):
         X = np.array(list(stats.keys()))
         Y = np.array(list(stats.values()))
         label = os.path.basename(filename).split('.')[0]
         subplot[n].plot(X[::4], Y[::4], '.', markersize=8)
         short_name = os.path.basename(filename).split('.')[0].replace('_', ' ')
         print(short_name, 
-              len(text), 'tokens; ',
-              text.dict_size(), 'types;')
+              num_tokens, 'tokens; ',
+              num_types, 'types;')
        
-        # use initial 10000 tokens to predict the shape of the curve
-        XX = X[:10]
-        YY = Y[:10]
-        # exponential fit
-        bf = BestFit('exp2')
-        pars = bf.fit(XX, YY, p0=(1000, 1000))
-        par_text = ', '.join(map(lambda x: f'{x:.1f}', pars))
-        subplot[n].plot(X, bf.f(X, *pars), '.', label='M1')
-        print('M1 pars=', par_text)
-        
-        # quotient fit
-        bf = BestFit('bio_model2')
-        pars = bf.fit(XX, YY, p0=(1000, 1000))
-        par_text = ', '.join(map(lambda x: f'{x:.1f}', pars))
-        subplot[n].plot(X, bf.f(X, *pars), '+', label='M2')
-        print('M2 pars=', par_text)
-        
-         # Power fit
-        bf = BestFit('bio_model3')
-        pars = bf.fit(XX, YY, p0=(1000, 1, 10))
-        par_text = ', '.join(map(lambda x: f'{x:.1f}', pars))
-        subplot[n].plot(X, bf.f(X, *pars), '-', label='M3')
-        print('M3 pars=', par_text)
+        # use initial 10000 tokens to predict the shape of the curve:
+        # exponential (M1), quotient (M2) and generalized quotient (M3) fits
+        models = {'exp2': {'p0': (1000, 1000)},
+                  'bio_model2': {'p0': (1000, 1000)},
+                  'bio_model3': {'p0': (1000, 1, 10)}}
+        ranking = BestFit.select(X, Y, models, 
+                                 criterion='extrapolation', train=10)
+        fits = {name: pars for name, _, pars in ranking}
+        for label, name, marker in (('M1', 'exp2', '.'), 
+                                    ('M2', 'bio_model2', '+'),
+                                    ('M3', 'bio_model3', '-')):
+            pars = fits[name]
+            par_text = ', '.join(map(lambda x: f'{x:.1f}', pars))
+            subplot[n].plot(X, BestFit(name).f(X, *pars), marker, label=label)
+            print(f'{label} pars=', par_text)
+        print('Extrapolation error:', 
+              ', '.join(f'{name} {score:.1f}' for name, score, _ in ranking))
         
         # Power fit
         bf = BestFit('power')
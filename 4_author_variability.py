@@ -12,8 +12,8 @@ import sys, os
 import configparser
 import numpy as np
 import matplotlib.pyplot as plt
-from div import Text, BestFit
-import zipfile
+from div import BestFit, Corpus, bootstrap, rarefaction
+from functools import partial
 def load_params():
     """
     Load configuration file
@@ -25,6 +25,49 @@ def load_params():
    
     
     return config['LEXICAL']
+
+def statistics(text):
+    """
+    Returns
+    -------
+    tuple
+        diversity curve (step = 1000), number of tokens in text
+        and number of occurrences of every token type.
+    """
+    return text.token_diversity(1000), len(text), text.counts()
+
+def asymptotic_diversity(counts, X, p0, bounds, points=10, processes=1):
+    """
+    Asymptotic diversity (yM) of power fits to the rarefaction curves
+    
+    Parameters
+    ----------
+    counts : 2-dimensional array of int
+        token counts, one collection per row.
+    X : array of int
+        the sample sizes for the rarefaction curves.
+    p0, bounds:
+        parameters to be passed to BestFit.fit_many.
+    points : int, optional
+        number of sizes in X (evenly spaced, including the largest one)
+        where the curves are rarefied. The default is 10.
+    processes : int, optional
+        number of processes for the fits (all CPUs if None). 
+        The default is 1.
+        
+    Returns
+    -------
+    numpy array of float
+        parameter yM for every row (nan if the fit fails).
+    """
+    # rarefaction is costly, and a few points are enough for the fit
+    X = np.unique(X[np.linspace(0, len(X) - 1, points).round().astype(int)])
+    series = [(X, rarefaction(row, X)[1]) for row in counts]
+    params, _, _ = BestFit('power').fit_many(series, p0, bounds=bounds,
+                                             processes=processes)
+            
+    return params[:, 0]
+
 if __name__ == '__main__':
     if len(sys.argv) > 1:
         archive_name = sys.argv[1]
@@ -33,25 +76,32 @@ if __name__ == '__main__':
          config.read('diversity.ini')
          archive_name  = config.get('AUTHOR', 'archive_name')
     
-    archive = zipfile.ZipFile(archive_name, 'r')
+    corpus = Corpus(archive_name)
                 
     res = list()
-    for filename in archive.namelist():
-        content = archive.open(filename).read().decode('UTF-8')
-        text = Text(content)
-        stats = text.token_diversity(1000)
-        X = np.array(list(stats.keys()))
-        Y = np.array(list(stats.values()))
-        bf = BestFit('power')
-        p0 = (1000, 1, 10)
-        bounds = ([100, 0., 1], [2000, 10, 80000])
-        try:
-            pars = bf.fit(X, Y, p0=p0, bounds=bounds)
+    results = corpus.map(statistics, encoded=True)
+    series = [(np.array(list(stats.keys())), np.array(list(stats.values())))
+              for _, (stats, _, _) in results]
+    bf = BestFit('power')
+    p0 = (1000, 1, 10)
+    bounds = ([100, 0., 1], [2000, 10, 80000])
+    params, _, failed = bf.fit_many(series, p0, bounds=bounds)
+    for n, (filename, (stats, num_tokens, counts)) in enumerate(results):
+        X, _ = series[n]
+        if not failed[n]:
+            pars = params[n]
             par_text = ', '.join(map(lambda x: f'{x:.1f}', pars))
-            print(filename, len(text), '\n\t', par_text)
-            res.append((len(text), pars[0]))
-        except RuntimeError:
-            print(filename, len(text), 'best fit not found\n')
+            print(filename, num_tokens, '\n\t', par_text)
+            res.append((num_tokens, pars[0]))
+            statistic = partial(asymptotic_diversity, X=X, p0=p0, 
+                                bounds=bounds, processes=None)
+            # the interval is for yM fitted to the rarefaction curve 
+            # (which does not depend on the token order), not pars[0]
+            yM, low, high = bootstrap(counts, statistic, resamples=100)
+            print(f'\tyM of the rarefaction curve = {yM:.1f},',
+                  f'95% CI = [{low:.1f}, {high:.1f}]')
+        else:
+            print(filename, num_tokens, 'best fit not found\n')
        
     
     X, Y = zip(*res)
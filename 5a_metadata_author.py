@@ -6,11 +6,11 @@ Created on Tue Nov 30 11:00:29 2021
 @author: UA - DLSI - RCC
 """
 import configparser
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from collections import Counter
-from div import richness, shannon_diversty_index, dr_rate
+from div import dr_rate, bootstrap, cumulative_diversity
+from MARCXML_parser import read_catalogue
 
 def average_number_occurrences(items):
     """
@@ -45,12 +45,8 @@ def plot_author_diversity(host, df, years):
     """
     plt.clf()
     X = np.array(years)
-    R = list()  # richness
-    D = list()  # diversity
-    for year in X:
-        selection = df[df.YEAR <= year]
-        R.append(richness(selection.MAIN_AUTHOR))
-        D.append(shannon_diversty_index(selection.MAIN_AUTHOR))
+    # richness and diversity
+    R, D = cumulative_diversity(df.YEAR, df.MAIN_AUTHOR, X)
     
     plt.plot(X, R, 's', label='richness')
     plt.plot(X, D, 'o', label='diversity')
@@ -75,9 +71,13 @@ intervals = params['INTERVALS'].split()
 
 for host, filename, interval in zip(hosts, filenames, intervals):
     print('Processing', host)
-    df = pd.read_csv(filename, sep='\t').fillna('')
-    df = df[(df.YEAR!='')&(df.MAIN_AUTHOR!='')]
+    df = read_catalogue(filename)
+    df = df[df.YEAR.notna() & (df.MAIN_AUTHOR != '')]
     first, last = map(int, interval.split('-'))
     plot_author_diversity(host, df, range(first, last + 1))
     print('DR_rate=', dr_rate(df.MAIN_AUTHOR))
+    counts = list(Counter(df.MAIN_AUTHOR).values())
+    for statistic in ('diversity', 'dr_rate'):
+        _, low, high = bootstrap(counts, statistic)
+        print(f'{statistic} 95% CI = [{low:.4g}, {high:.4g}]')
     print('AV NUM TITLES=', average_number_occurrences(df.MAIN_AUTHOR))
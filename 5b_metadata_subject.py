@@ -6,11 +6,11 @@ Created on Tue Nov 30 11:00:29 2021
 @author: UA - DLSI - RCC
 """
 import configparser
-import pandas as pd
 import re
 import numpy as np
 import matplotlib.pyplot as plt
-from div import richness, shannon_diversty_index, dr_rate
+from div import dr_rate, cumulative_diversity
+from MARCXML_parser import read_catalogue
 
 
 def plot_subject_diversity(host, df, column_name, years, r_scale=1):
@@ -29,12 +29,9 @@ def plot_subject_diversity(host, df, column_name, years, r_scale=1):
     """
     plt.clf()
     X = np.array(years)
-    R = list()  # richness
-    D = list()  # diversity
-    for year in X:
-        values = df[df.YEAR <= year][column_name]
-        R.append(richness(values) / r_scale)
-        D.append(shannon_diversty_index(values))
+    # richness and diversity
+    R, D = cumulative_diversity(df.YEAR, df[column_name], X)
+    R = R / r_scale
     if r_scale == 1:
         plt.plot(X, R, 's', label='richness')
     else: 
@@ -71,27 +68,6 @@ def split_subject(subject):
     return list(filter(lambda t: len(t) > 1 , map(str.strip, tokens)))
   
 
-def split(s, separator):
-    """
-    Return all  tokens in the string after split by symbol s    
-
-    Parameters
-    ----------
-    s : str
-        input string.
-    separator : str
-        character used as separator.
-
-    Returns
-    -------
-    list
-        All tokens of length at least 2 after splitting s by separators.
-
-    """
-    tokens = re.split('\s*' + separator + '\s*', s.strip())
-    
-    return list(filter(lambda t: len(t) > 1 , map(str.strip, tokens)))
-
 #----------------------------------------------------  
 # Main code
 config = configparser.ConfigParser()
@@ -105,10 +81,11 @@ scale =  map(int, params['RICHNESS_SCALES'].split())
 for host, filename, interval in zip(hosts, filenames, intervals):
     print('Processing', host)
     first, last = map(int, interval.split('-'))
-    df = pd.read_csv(filename, sep='\t').fillna('')
-    df = df[(df.YEAR!='')&(df.SUBJECT_HEADINGS.str.len() > 1)]
-    df['SUBJECT_HEADINGS'] = df.SUBJECT_HEADINGS.apply(lambda s: split(s, '@'))
-    df = df.explode('SUBJECT_HEADINGS')
+    df = read_catalogue(filename)
+    df = df[df.YEAR.notna()].copy()
+    df['SUBJECT_HEADINGS'] = df.SUBJECT_HEADINGS.map(
+        lambda topics: [t.strip() for t in topics if len(t.strip()) > 1])
+    df = df[df.SUBJECT_HEADINGS.str.len() > 0].explode('SUBJECT_HEADINGS')
     plot_subject_diversity(host, 
                            df, 
                            'SUBJECT_HEADINGS', 
@@ -116,7 +93,7 @@ for host, filename, interval in zip(hosts, filenames, intervals):
                            next(scale))
 
     print('DR_RATE=', dr_rate(df.SUBJECT_HEADINGS))
-    df['SH_SUBFIELDS'] = df['SUBJECT_HEADINHS'].map(split_subject)
+    df['SH_SUBFIELDS'] = df['SUBJECT_HEADINGS'].map(split_subject)
     dfe = df.explode('SH_SUBFIELDS')
     plot_subject_diversity(host, 
                            dfe,
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Update the stored diversity of authors and subjects in a catalogue with
+new, modified or deleted records, and print the updated statistics.
+
+Usage: 5c_metadata_update.py host catalogue [deleted]
+with catalogue the output of MARCXML_parser.py for the full catalogue
+(first run) or for a delta file, and deleted a file with the identifiers
+of the removed records (one per line).
+States are stored in the folder states.
+
+@author: UA - DLSI - RCC
+"""
+import sys, os
+import configparser
+from div import CatalogueDiversity
+from MARCXML_parser import read_catalogue
+
+
+def records(df, column):
+    """
+    Parameters
+    ----------
+    df : DataFrame
+        DataFrame with columns RECORD_ID, YEAR and column.
+    column : str
+        MAIN_AUTHOR or SUBJECT_HEADINGS.
+
+    Returns
+    -------
+    list of (str, float, list)
+        identifier, year and items of every record
+        (records with unknown year have no items).
+    """
+    if column == 'MAIN_AUTHOR':
+        items = df.MAIN_AUTHOR.map(lambda author: [author] if author else [])
+    else:
+        items = df.SUBJECT_HEADINGS.map(
+            lambda topics: [t.strip() for t in topics if len(t.strip()) > 1])
+    items = [i if year == year else [] for i, year in zip(items, df.YEAR)]
+
+    return list(zip(df.RECORD_ID, df.YEAR, items))
+
+
+# Main code
+host, filename = sys.argv[1:3]
+config = configparser.ConfigParser()
+config.read('diversity.ini')
+params = config['METADATA']
+intervals = dict(zip(params['hosts'].split(), params['INTERVALS'].split()))
+first, last = map(int, intervals[host].split('-'))
+df = read_catalogue(filename)
+if len(sys.argv) > 3:
+    with open(sys.argv[3]) as f:
+        deleted = f.read().split()
+else:
+    deleted = list()
+
+os.makedirs('states', exist_ok=True)
+for column in ('MAIN_AUTHOR', 'SUBJECT_HEADINGS'):
+    path = f'states/{column}_{host}.sqlite'
+    if os.path.exists(path):
+        state = CatalogueDiversity.load(path)
+    else:
+        state = CatalogueDiversity(range(first, last + 1))
+    state.update(records(df, column), deleted)
+    state.save(path)
+    R, D = state.cumulative()
+    print(f'{column}: {len(state)} records, richness={state.richness()},',
+          f'diversity={state.diversity():.1f}, DR_rate={state.dr_rate():.4g}')
+    print(f'\t{last}: richness={R[-1]}, diversity={D[-1]:.1f}')
@@ -1,18 +1,300 @@
-import sys, re
+import sys, os, re
+import json
 from xml.sax.handler import ContentHandler
 from xml.sax import make_parser
-from io import StringIO
+from xml.parsers import expat
+from io import StringIO, BytesIO
 import gzip
+import zipfile
+from itertools import chain
+from collections import deque
+from multiprocessing import Pool
+import numpy as np
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+class Field(object):
+    """
+    Extraction rule for one output column: the content of a MARC field,
+    taken from the first of its tags (by priority) present in the record
+    """
+    def __init__(self, tags, codes=None, clean=None, join=' ', parse=None, 
+                 repeat=False, integer=False, default=''):
+        """
+        Parameters
+        ----------
+        tags : tuple of str
+            MARC tags, by decreasing priority.
+        codes : str, optional
+            Subfield codes extracted, all alphabetic codes if None 
+            (ignored in controlfields). The default is None.
+        clean : callable, optional
+            Function applied to the text of every subfield. 
+            The default is None.
+        join : str, optional
+            Separator between subfields. The default is ' '.
+        parse : callable, optional
+            Function of the tag and text applied to the field content. 
+            The default is None.
+        repeat : bool, optional
+            True for a column with the list of values in all occurrences of
+            the field (otherwise, the last one is kept). The default is False.
+        integer : bool, optional
+            True if the value is an int ('' if missing). The default is False.
+        default : str, optional
+            Value if the field is missing. The default is ''.
+        """
+        self.tags = tags
+        self.codes = None if codes is None else tuple(codes)
+        self.clean = clean
+        self.join = join
+        self.parse = parse
+        self.repeat = repeat
+        self.integer = integer
+        self.default = default
+        
+    def value(self, tag, content):
+        """
+        Parameters
+        ----------
+        tag : str
+            The MARC tag.
+        content : str or list of (str, str)
+            Text in a controlfield, or code and text of every subfield
+            in a datafield.
+
+        Returns
+        -------
+        str or int
+            The value extracted from the field.
+        """
+        if not isinstance(content, str):
+            texts = [text for code, text in content 
+                     if (code in self.codes if self.codes else code.isalpha())]
+            if self.clean:
+                texts = map(self.clean, texts)
+            content = self.join.join(texts)
+        if self.parse and content:
+            return self.parse(tag, content)
+        else:
+            return content
+
+
+# number in an identifier field
+def _identifier_(tag, text):
+    return MARC_Handler._parse_(tag, text)
+
+# year of publication, from the first two digits in field 008
+def _year_(tag, text):
+    year = MARC_Handler._parse_(tag, text)
+    if not year.isdigit():
+        return ''
+    year = int(year)
+    if year < 100:
+        return 2000 + year if year < 30 else 1900 + year
+    return year
+
+# subfield text with periods removed
+def _clean_(text):
+    return text.replace('.', ' ').strip()
+
+# subfield text without final punctuation
+def _trim_(text):
+    return text.strip(' /:;,.=')
+
+
+"""
+Available output columns:
+    RECORD_ID 001 (or 010 $a): record identifier
+    YEAR 008: record information (NR = non-repeatable, starts with year)
+    MAIN_AUTHOR 100 $a $d: main author name and dates (NR)
+    SUBJECT_HEADINGS 650: topical terms (R = repeatable)
+    TYPE 920 $a: UGent record type
+    TITLE 245 $a $b: title and remainder of title (NR)
+    PUBLISHER 260 $b (or 264 $b): publisher name 
+    LANGUAGE 041 $a: language codes 
+    ADDED_AUTHORS 700 $a $d: added personal names (R)
+"""
+fields = {
+    'RECORD_ID': Field(('001', '010'), codes='a', parse=_identifier_),
+    'YEAR': Field(('008',), parse=_year_, integer=True),
+    'MAIN_AUTHOR': Field(('100',), codes='ad', clean=_clean_),
+    'SUBJECT_HEADINGS': Field(('650',), clean=_clean_, join='--', repeat=True),
+    'TYPE': Field(('920',), codes='a', default='*'),
+    'TITLE': Field(('245',), codes='ab', clean=_trim_),
+    'PUBLISHER': Field(('260', '264'), codes='b', clean=_trim_),
+    'LANGUAGE': Field(('041',), codes='a'),
+    'ADDED_AUTHORS': Field(('700',), codes='ad', clean=_clean_, repeat=True)
+    }
+
+# default output columns
+columns = ('RECORD_ID', 'YEAR', 'MAIN_AUTHOR', 'SUBJECT_HEADINGS', 'TYPE')
+
+
+class ColumnWriter(object):
+    """
+    Store records as typed columns, written in chunks to a Parquet (.parquet),
+    Arrow IPC (.arrow) or, if pyarrow is not available, NumPy (.npz) file.
+    Repeatable fields are stored as list columns 
+    (as values and lengths arrays in npz files).
+    """
+    def __init__(self, filename, columns=columns, chunk_size=100000):
+        """
+        Parameters
+        ----------
+        filename : str
+            The output filename (its extension selects the format).
+        columns : tuple of str, optional
+            The output columns (keys in fields). The default is columns.
+        chunk_size : int, optional
+            Number of records per chunk (row group). The default is 100000.
+
+        Raises
+        ------
+        NotImplementedError
+            If the output format is not supported.
+        """
+        self.filename = filename
+        self.columns = columns
+        self.fields = [fields[name] for name in columns]
+        self.chunk_size = chunk_size
+        self.chunks = 0
+        self.format = filename.split('.')[-1]
+        if self.format in ('parquet', 'arrow'):
+            if pa is None:
+                raise NotImplementedError('pyarrow is required for', filename)
+            types = [pa.list_(pa.string()) if field.repeat 
+                     else pa.int32() if field.integer else pa.string()
+                     for field in self.fields]
+            self.schema = pa.schema(list(zip(columns, types)))
+            if self.format == 'parquet':
+                self.writer = pq.ParquetWriter(filename, self.schema)
+            else:
+                self.writer = pa.ipc.new_file(filename, self.schema)
+        elif self.format == 'npz':
+            self.writer = zipfile.ZipFile(filename, 'w')
+        else:
+            raise NotImplementedError('Unsupported output format', filename)
+        self.reset()
+        
+    # empty column buffers
+    def reset(self):
+        self.buffers = tuple(list() for _ in self.columns)
+        
+    # add one record (a tuple with one value per column)
+    def append(self, record):
+        for buffer, value in zip(self.buffers, record):
+            buffer.append(value)
+        if len(self.buffers[0]) >= self.chunk_size:
+            self.flush()
+    
+    # write buffered records as a new chunk
+    def flush(self):
+        if len(self.buffers[0]) == 0:
+            return
+        values = [[None if v == '' else v for v in buffer] if field.integer 
+                  else buffer for field, buffer in zip(self.fields, self.buffers)]
+        if self.format == 'npz':
+            arrays = dict()
+            for name, field, buffer in zip(self.columns, self.fields, values):
+                if field.repeat:
+                    arrays[name] = np.array(list(chain(*buffer)), dtype=str)
+                    arrays[f'{name}_LENGTHS'] = np.array(list(map(len, buffer)),
+                                                         dtype=np.int32)
+                elif field.integer:
+                    arrays[name] = np.array([-1 if v is None else v 
+                                             for v in buffer], dtype=np.int32)
+                else:
+                    arrays[name] = np.array(buffer, dtype=str)
+            for name, array in arrays.items():
+                with self.writer.open(f'{name}.{self.chunks}.npy', 'w', 
+                                      force_zip64=True) as target:
+                    np.lib.format.write_array(target, array, 
+                                              allow_pickle=False)
+        else:
+            batch = pa.record_batch(values, schema=self.schema)
+            if self.format == 'parquet':
+                self.writer.write_batch(batch)
+            else:
+                self.writer.write(batch)
+        self.chunks += 1
+        self.reset()
+        
+    # write remaining records and close the output file
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def read_catalogue(filename):
+    """
+    Load a catalogue written by MARC_Parser (TSV, Parquet, Arrow IPC or npz)
+
+    Parameters
+    ----------
+    filename : str
+        The input filename.
+
+    Returns
+    -------
+    DataFrame
+        One row per record with one column per extracted field, such as 
+        RECORD_ID, YEAR (float, NaN if unknown), MAIN_AUTHOR, 
+        SUBJECT_HEADINGS (list of str) and TYPE.
+    """
+    import pandas as pd
+    
+    if filename.endswith('.parquet'):
+        df = pd.read_parquet(filename, memory_map=True)
+    elif filename.endswith('.arrow'):
+        with pa.memory_map(filename) as source:
+            df = pa.ipc.open_file(source).read_all().to_pandas()
+    elif filename.endswith('.npz'):
+        data = np.load(filename)
+        names = [key[:-2] for key in data.files if key.endswith('.0')]
+        # a file without records has no arrays
+        chunks = len(data.files) // len(names) if names else 0
+        column = lambda name: np.concatenate([data[f'{name}.{k}'] 
+                                              for k in range(chunks)])
+        df = pd.DataFrame() if names else pd.DataFrame(columns=columns)
+        for name in names:
+            if name.endswith('_LENGTHS'):
+                continue
+            elif f'{name}_LENGTHS' in names:
+                offsets = np.cumsum(np.r_[0, column(f'{name}_LENGTHS')])
+                values = column(name).tolist()
+                df[name] = [values[begin:end] for begin, end 
+                            in zip(offsets[:-1], offsets[1:])]
+            elif fields[name].integer:
+                values = column(name).astype(float)
+                values[values < 0] = np.nan
+                df[name] = values
+            else:
+                df[name] = column(name)
+    else:
+        df = pd.read_csv(filename, sep='\t', dtype=str, keep_default_na=False)
+        for name in df.columns:
+            if fields[name].repeat:
+                df[name] = df[name].map(lambda s: s.split('@') if s else list())
+            elif fields[name].integer:
+                df[name] = pd.to_numeric(df[name])
+    for name in df.columns:
+        if fields[name].integer:
+            df[name] = df[name].astype(float)
+        elif fields[name].repeat:
+            # pyarrow returns numpy arrays
+            df[name] = df[name].map(list)
+    
+    return df
 
 class MARC_Handler(ContentHandler):
     """
-    SAX call backsfor thr following MARC fields
-        001: record identifier
-        008: record information (NR = non-repeatable, starts with year)
-        010 $a: LoC record identifier (NR)
-        100 $a $d: main author name and dates (NR)
-        650: topical term (R = repeatable)   
-        920: $a UGent record type
+    SAX call backs extracting the MARC fields in the selected columns 
+    (see fields). The extraction rules for every tag are compiled 
+    into a dispatch table, so that other fields are just skipped.
     """
     patterns = {
         '001':re.compile(r'\D*(\d+)\b'),
@@ -32,16 +314,23 @@ class MARC_Handler(ContentHandler):
                   file=sys.stderr)
             return ''
         
-    def __init__(self, target):
+    def __init__(self, target, columns=columns):
         self.target = target
         self.num_records = 0
-        self.tag = None
+        self.fields = [fields[name] for name in columns]
+        # rules (column number, tag priority, field) for every tag
+        self.table = dict()
+        for n, field in enumerate(self.fields):
+            for priority, tag in enumerate(field.tags):
+                self.table.setdefault(tag, list()).append((n, priority, field))
+        self.rules = None
         self.content = StringIO()
         
         
-    # return textual content and reset text buffer
+    # return textual content (with whitespace runs collapsed to a single
+    # space, so that no newline reaches the output) and reset text buffer
     def getvalue(self):
-        text = self.content.getvalue()
+        text = ' '.join(self.content.getvalue().split())
         self.content.truncate(0)
         self.content.seek(0)
         
@@ -49,116 +338,595 @@ class MARC_Handler(ContentHandler):
         
     # reset record variables
     def reset(self):
-        # main variables
-        self.record_id = ''
-        self.year = ''
-        self.author = ''
-        self.topics = list()
-        self.type = '*'
-        
-        # auxiliary variables (field tag and subfields)
+        # (priority, value) pairs found for every column
+        self.values = tuple(list() for _ in self.fields)
+        
+        # auxiliary variables (field tag, extraction rules and subfields)
         self.tag = None
+        self.rules = None
         self.subfields = None
         
+    # relevant values in current record (one per output column)
+    def record(self):
+        record = list()
+        for field, values in zip(self.fields, self.values):
+            if field.repeat:
+                record.append([value for _, value in values])
+            else:
+                # last non-empty value with the highest priority
+                best, top = field.default, len(field.tags)
+                for priority, value in values:
+                    if value != '' and priority <= top:
+                        best, top = value, priority
+                record.append(best)
+                
+        return tuple(record)
+        
     def __str__(self):
-        return '\t'.join((self.record_id, 
-                          str(self.year), 
-                          self.author, 
-                          '@'.join(self.topics), self.type))
+        return '\t'.join('@'.join(value) if isinstance(value, list) 
+                         else str(value) for value in self.record())
         
         
     # opening a new XML element
     def startElement(self, name, attrs):
-        if name == 'record':
-            self.reset()
-        elif name == 'controlfield':
-            self.tag = attrs.get('tag')
-            self.subfields = None
-        elif name == 'datafield':
+        if name == 'subfield':
+            if self.rules:
+                self.code = attrs.get('code')
+        elif name == 'datafield' or name == 'controlfield':
             self.tag = attrs.get('tag')
+            self.rules = self.table.get(self.tag)
             self.subfields = list()
-        elif name == 'subfield' and self.tag in ('010', '100', '650', '920'):
-            self.code = attrs.get('code')
-            
+            if self.rules:
+                self.getvalue()
+        elif name == 'record':
+            self.reset()
             
-    # save content to buffer (for efficiencly, only for selected fields)
+    # save content to buffer (only for selected fields)
     def characters(self, text):
-        if self.tag in ('001', '008', '010', '100', '650', '920') :
-            self.content.write(text.strip())
+        if self.rules:
+            self.content.write(text)
       
     # closing an XML element
     def endElement(self, name):
-        if name == 'record':
-            print(self, file=self.target)
+        if name == 'subfield':
+            if self.rules:
+                self.subfields.append((self.code, self.getvalue()))
+        elif name == 'datafield' or name == 'controlfield':
+            if self.rules:
+                content = self.subfields if name == 'datafield' \
+                    else self.getvalue()
+                for n, priority, field in self.rules:
+                    self.values[n].append((priority, 
+                                           field.value(self.tag, content)))
+                self.rules = None
+        elif name == 'record':
+            if isinstance(self.target, (ColumnWriter, list)):
+                self.target.append(self.record())
+            else:
+                print(self, file=self.target)
             self.num_records += 1
             if self.num_records % 100000 == 0:
                 print(f'{self.num_records // 1000}K records', file=sys.stderr)
-        elif name == 'controlfield':
-            if self.tag == '001':
-                self.record_id = self._parse_(self.tag, self.getvalue())
-            elif self.tag == '008':
-                year = int(self._parse_(self.tag, self.getvalue()))
-                if year < 100:
-                    self.year = 2000 + year if year < 30 else 1900 + year
-                else:
-                    self.year = year
-        elif name == 'datafield':
-            if self.tag == '100':
-                self.author = ' '.join(self.subfields)
-            elif self.tag == '650':
-                self.topics.append('--'.join(self.subfields))
-        elif name == 'subfield':
-            content = self.getvalue()
-            if self.tag == '010' and self.code == 'a':
-                if self.record_id == '':
-                    self.record_id = self._parse_(self.tag, content)
-            elif self.tag == '100' and self.code in ('a', 'd'):
-                self.subfields.append(content.replace('.', ' ').strip())
-            elif self.tag == '650' and self.code.isalpha():
-                self.subfields.append(content.replace('.', ' ').strip())
-            elif self.tag == '920' and self.code == 'a':
-                self.type = content.strip()
                 
+
+class MARC_ExpatHandler(MARC_Handler):
+    """
+    MARC_Handler for direct expat callbacks: character data is only 
+    requested from the parser inside the selected fields, and collected 
+    in a list instead of a StringIO buffer
+    """
+    def __init__(self, target, parser, columns=columns):
+        super().__init__(target, columns)
+        self.parser = parser
+        self.content = list()
+        parser.StartElementHandler = self.startElement
+        parser.EndElementHandler = self.endElement
+        
+    # return textual content (whitespace collapsed) and reset text buffer
+    def getvalue(self):
+        text = ' '.join(''.join(self.content).split())
+        self.content.clear()
+        
+        return text
+    
+    # opening a new XML element
+    def startElement(self, name, attrs):
+        if name == 'subfield':
+            if self.rules:
+                self.code = attrs.get('code')
+        elif name == 'datafield' or name == 'controlfield':
+            self.tag = attrs.get('tag')
+            self.rules = self.table.get(self.tag)
+            self.subfields = list()
+            if self.rules:
+                self.content.clear()
+                self.parser.CharacterDataHandler = self.content.append
+            else:
+                self.parser.CharacterDataHandler = None
+        elif name == 'record':
+            self.reset()
+            self.parser.CharacterDataHandler = None
+    
+    # closing an XML element
+    def endElement(self, name):
+        if self.rules or name == 'record':
+            super().endElement(name)
+            if self.rules is None:
+                self.parser.CharacterDataHandler = None
+        
+        
+class MARC_IndexHandler(MARC_ExpatHandler):
+    """
+    MARC_ExpatHandler which also writes the identifier, byte offset and 
+    length of every record to an index file, and saves a checkpoint
+    every some records
+    """
+    def __init__(self, target, parser, columns=columns, index=None, 
+                 checkpoint=None, save=None, shift=0, num_records=0):
+        """
+        Parameters
+        ----------
+        target : text file
+            The CSV output.
+        parser : xmlparser
+            The expat parser.
+        columns : tuple of str, optional
+            The output columns (keys in fields). The default is columns.
+        index : text file, optional
+            The index output. The default is None.
+        checkpoint : int, optional
+            Number of records between checkpoints. The default is None.
+        save : callable, optional
+            Function of the number of records parsed and the input offset 
+            after the last one, called at every checkpoint. 
+            The default is None.
+        shift : int, optional
+            Offset in the input of the bytes sent to the parser 
+            (as returned by CurrentByteIndex). The default is 0.
+        num_records : int, optional
+            Number of records already parsed. The default is 0.
+        """
+        super().__init__(target, parser, columns)
+        self.index = index
+        self.key = columns.index('RECORD_ID') if index else None
+        self.checkpoint = checkpoint
+        self.save = save
+        self.shift = shift
+        self.num_records = num_records
+        
+    # opening a new XML element
+    def startElement(self, name, attrs):
+        if name == 'record':
+            self.start = self.parser.CurrentByteIndex + self.shift
+        super().startElement(name, attrs)
+        
+    # closing an XML element
+    def endElement(self, name):
+        super().endElement(name)
+        if name == 'record':
+            end = self.parser.CurrentByteIndex + self.shift + len('</record>')
+            if self.index:
+                print(self.record()[self.key], self.start, end - self.start, 
+                      sep='\t', file=self.index)
+            if self.checkpoint and self.num_records % self.checkpoint == 0:
+                self.save(self.num_records, end)
+        
+
+def load_index(filename):
+    """
+    Parameters
+    ----------
+    filename : str
+        An index file written by MARC_Parser.parse_to_file.
+
+    Returns
+    -------
+    dict
+        The offset and length (in bytes) in the uncompressed XML file of the
+        record with every identifier.
+    """
+    with open(filename) as f:
+        rows = (line.rstrip('\n').split('\t') for line in f)
+        
+        return {key: (int(offset), int(length)) for key, offset, length in rows}
+    
+    
+def read_record(filename, offset, length):
+    """
+    Extract one record from a MARC-XML file, without parsing it.
+    For gzipped files, the uncompressed stream is read up to the record
+    (seeking in gzip files is not random access).
+
+    Parameters
+    ----------
+    filename : str
+        The input filename.
+    offset, length : int
+        Position and size of the record in the uncompressed XML file, 
+        as stored in the index.
+
+    Returns
+    -------
+    bytes
+        The XML record.
+    """
+    source = gzip.open(filename) if filename.endswith('.gz') \
+        else open(filename, 'rb')
+    with source:
+        source.seek(offset)
+        
+        return source.read(length)
+        
+        
+# read the XML header (up to the first record) from a binary source
+# and return the header, the bytes read after it and the closing tags 
+# for the elements open in the header
+def _header_(source, size=2**16):
+    buffer = source.read(size)
+    start = re.search(rb'<record[\s>]', buffer)
+    while start is None and len(buffer) < 2 * size:
+        block = source.read(size)
+        if not block:
+            break
+        buffer += block
+        start = re.search(rb'<record[\s>]', buffer)
+    begin = start.start() if start else len(buffer)
+    header, buffer = buffer[:begin], buffer[begin:]
+    markup = re.sub(rb'<\?.*?\?>|<!--.*?-->|<!.*?>', b'', header, flags=re.S)
+    opened = list()
+    for closing, name, empty in re.findall(rb'<(/?)([^\s/>]+)[^>]*?(/?)>', 
+                                            markup):
+        if closing:
+            opened.pop()
+        elif not empty:
+            opened.append(name)
+    footer = b''.join(b'</' + name + b'>' for name in reversed(opened))
+    
+    return header, buffer, footer
+    
+
+def shards(filename, shard_size=2**24):
+    """
+    Split a MARC-XML file into well-formed XML documents, each one with 
+    the complete records found in about shard_size bytes of XML.
+
+    Parameters
+    ----------
+    filename : str
+        The input filename.
+    shard_size : int, optional
+        Approximate size in bytes of every shard. The default is 2**24.
+
+    Raises
+    ------
+    NotImplementedError
+        If the input file format is not supported.
+
+    Yields
+    ------
+    bytes
+        The file header (up to the first record), the records in one shard
+        and the closing tags for the elements open in the header. 
+        At least one (possibly empty) shard is generated for every file.
+    """
+    if filename.endswith('.xml'):
+        source = open(filename, 'rb')
+    elif filename.endswith('.xml.gz'):
+        source = gzip.open(filename)
+    else:
+       raise NotImplementedError('File with unparsable extension', filename)
+    
+    with source:
+        header, buffer, footer = _header_(source, shard_size)
+        
+        shards = 0
+        while True:
+            block = source.read(shard_size)
+            buffer += block
+            end = buffer.rfind(b'</record>')
+            if end >= 0 or not block:
+                end = end + len('</record>') if end >= 0 else 0
+                if end > 0 or (not block and shards == 0):
+                    yield header + buffer[:end] + footer
+                    shards += 1
+                buffer = buffer[end:]
+            if not block:
+                break
+            
+
+# parse one shard (task is the file number, the output type, the parser 
+# backend, the output columns and the shard);
+# return file number and output (CSV text or list of records)
+def _parse_shard_(task):
+    n, table, backend, columns, shard = task
+    target = list() if table else StringIO()
+    MARC_Parser(backend, columns).run(target, BytesIO(shard))
+    
+    return n, target if table else target.getvalue()
+
+
+# apply function to every task in a pool (with at most size tasks pending, 
+# to bound memory usage) and yield the results in order
+def _imap_(pool, function, tasks, size):
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.apply_async(function, (task,)))
+        if len(pending) > size:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
 class MARC_Parser(object):
     """
-    Parse a MARC-XML file and extract relevant fields as CSV records
+    Parse a MARC-XML file and extract relevant fields as CSV records.
+    Events are sent to the MARC_Handler through the xml.sax interface 
+    or directly from expat callbacks (faster, with identical output).
     """
-    def __init__(self):   
-        self.sax_parser = make_parser()   
+    backends = ('sax', 'expat')
+    
+    def __init__(self, backend='expat', columns=columns):
+        """
+        Parameters
+        ----------
+        backend : str, optional
+            One of MARC_Parser.backends. The default is 'expat'.
+        columns : tuple of str, optional
+            The output columns (keys in fields). The default is columns.
+
+        Raises
+        ------
+        NotImplementedError
+            If the backend is not supported.
+        """
+        if backend not in MARC_Parser.backends:
+            raise NotImplementedError('Unsupported parser backend', backend)
+        self.backend = backend
+        self.columns = columns
+        
+    def run(self, target, source):
+        """
+        Parse an XML source and send the extracted records to the target.
+
+        Parameters
+        ----------
+        target : text file, list or ColumnWriter
+            The output (CSV lines are printed to files, record tuples 
+            are appended to lists and column writers).
+        source : binary file
+            The XML input.
+        """
+        if self.backend == 'sax':
+            parser = make_parser()
+            parser.setContentHandler(MARC_Handler(target, self.columns))
+            parser.parse(source)
+        else:
+            parser = expat.ParserCreate()
+            # deliver contiguous text in a single call
+            parser.buffer_text = True
+            parser.buffer_size = 2**16
+            MARC_ExpatHandler(target, parser, self.columns)
+            parser.ParseFile(source)
    
     @staticmethod
-    def print_header(target):
-        heads = ('RECORD_ID', 'YEAR', 'MAIN_AUTHOR', 'SUBJECT_HEADINGS', 'TYPE')
-        print('\t'.join(heads), file=target)
+    def print_header(target, columns=columns):
+        print('\t'.join(columns), file=target)
         
     
-    def parse_to_file(self, filename):    
+    def parse_to_file(self, filename, checkpoint=None, index=False):    
         """
         Parse XML to CSV file with same name and CSV extension.
+        With checkpoints, the progress is saved every some records to a 
+        file with extension ckpt and an interrupted run will be resumed
+        from the last checkpoint (the file is removed after a complete run).
 
         Parameters
         ----------
         filename : str
             The input filename.
+        checkpoint : int, optional
+            Number of records between checkpoints (no checkpoints if None).
+            The default is None.
+        index : bool, optional
+            If True, the identifier, offset and length (in the uncompressed
+            XML) of every record are written to a file with extension idx.
+            The default is False.
 
         Raises
         ------
         NotImplementedError
-            If the input file format is not supported.
+            If the input file format is not supported, or if checkpoints
+            or index are requested with a backend other than expat.
         """
+        resumable = checkpoint is not None or index
+        if resumable and self.backend != 'expat':
+            raise NotImplementedError('Checkpoints and index require expat')
         if filename.endswith('.xml'):
-            source = open(filename)
-            target = open(filename.replace('.xml','.csv'), 'w')
+            source = open(filename, 'rb')
+            output = filename.replace('.xml','.csv')
         elif filename.endswith('.xml.gz'):
             source = gzip.open(filename)
-            target = open(filename.replace('.xml.gz','.csv'), 'w')
+            output = filename.replace('.xml.gz','.csv')
         else:
            raise NotImplementedError('File with unparsable extension', filename)
-     
-        handler = MARC_Handler(target)
-        self.sax_parser.setContentHandler(handler)       
-        MARC_Parser.print_header(target)
-        self.sax_parser.parse(source)
+        
+        if resumable:
+            self._resume_(filename, source, output, checkpoint, index)
+        else:
+            target = open(output, 'w')
+            MARC_Parser.print_header(target, self.columns)
+            with source, target:
+                self.run(target, source)
+            
+    def _resume_(self, filename, source, output, checkpoint, index):
+        """
+        Parse XML to CSV with expat, saving checkpoints and writing 
+        an index, and resuming from the last checkpoint (if any).
+
+        Parameters
+        ----------
+        filename : str
+            The input filename.
+        source : binary file
+            The XML input.
+        output : str
+            The CSV output filename.
+        checkpoint : int
+            Number of records between checkpoints (None for no checkpoints).
+        index : bool
+            If True, write the index file.
+        """
+        base = output[:-len('.csv')]
+        state = None
+        if checkpoint and os.path.exists(f'{base}.ckpt'):
+            with open(f'{base}.ckpt') as f:
+                state = json.load(f)
+        if state is None:
+            target = open(output, 'w')
+            MARC_Parser.print_header(target, self.columns)
+            index = open(f'{base}.idx', 'w') if index else None
+        else:
+            target = open(output, 'r+')
+            target.seek(state['output'])
+            target.truncate()
+            if index:
+                index = open(f'{base}.idx', 'r+')
+                index.seek(state['index'])
+                index.truncate()
+            print(f'Resuming {filename} after {state["records"]} records', 
+                  file=sys.stderr)
+        
+        # save progress after the output is flushed
+        def save(num_records, offset):
+            for f in (target, index):
+                if f:
+                    f.flush()
+                    os.fsync(f.fileno())
+            state = {'records': num_records,
+                     'offset': offset, 
+                     # approximate, the decompressor reads ahead
+                     'compressed': getattr(source, 'fileobj', source).tell(),
+                     'output': target.tell(),
+                     'index': index.tell() if index else 0}
+            with open(f'{base}.ckpt.tmp', 'w') as f:
+                json.dump(state, f)
+            os.replace(f'{base}.ckpt.tmp', f'{base}.ckpt')
+        
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.buffer_size = 2**16
+        with source, target:
+            if state is None:
+                MARC_IndexHandler(target, parser, self.columns, index, 
+                                  checkpoint, save)
+                parser.ParseFile(source)
+            else:
+                # parse the header and the input after the last checkpoint
+                header, _, _ = _header_(source)
+                source.seek(state['offset'])
+                MARC_IndexHandler(target, parser, self.columns, index, 
+                                  checkpoint, save, 
+                                  state['offset'] - len(header), 
+                                  state['records'])
+                parser.Parse(header, False)
+                parser.ParseFile(source)
+        if index:
+            index.close()
+        if checkpoint and os.path.exists(f'{base}.ckpt'):
+            os.remove(f'{base}.ckpt')
+        
+    def parse_to_table(self, filename, output=None):    
+        """
+        Parse XML to a columnar file, by default a Parquet file with 
+        the same name (or a NumPy npz file if pyarrow is not installed).
+
+        Parameters
+        ----------
+        filename : str
+            The input filename.
+        output : str, optional
+            The output filename, with extension parquet, arrow or npz.
+            The default is None.
+
+        Raises
+        ------
+        NotImplementedError
+            If the input or output file format is not supported.
+        """
+        if filename.endswith('.xml'):
+            source = open(filename, 'rb')
+        elif filename.endswith('.xml.gz'):
+            source = gzip.open(filename)
+        else:
+           raise NotImplementedError('File with unparsable extension', filename)
+        if output is None:
+            extension = 'parquet' if pa is not None else 'npz'
+            output = re.sub(r'\.xml(\.gz)?$', f'.{extension}', filename)
+        
+        target = ColumnWriter(output, self.columns)
+        with source:
+            self.run(target, source)
+        target.close()
+        
+    def parse_files(self, filenames, table=False, processes=None, 
+                    shard_size=2**24):
+        """
+        Parse XML files in parallel, with the same output as parse_to_file
+        (or parse_to_table) for every file. Files are split into shards 
+        which are parsed by a pool of processes; the output is written 
+        in the original order of the records.
+
+        Parameters
+        ----------
+        filenames : list of str
+            The input filenames.
+        table : bool, optional
+            True for columnar output, False for CSV. The default is False.
+        processes : int, optional
+            Number of processes in the pool (all CPUs if None). 
+            The default is None.
+        shard_size : int, optional
+            Approximate size in bytes of every shard. The default is 2**24.
+
+        Raises
+        ------
+        NotImplementedError
+            If the input file format is not supported.
+        """
+        processes = processes or os.cpu_count()
+        tasks = ((n, table, self.backend, self.columns, shard) 
+                 for n, filename in enumerate(filenames)
+                 for shard in shards(filename, shard_size))
+        current, target, num_records = None, None, 0
+        with Pool(processes) as pool:
+            for n, output in _imap_(pool, _parse_shard_, tasks, 2 * processes):
+                if n != current:
+                    if target is not None:
+                        target.close()
+                    current = n
+                    filename = filenames[n]
+                    if table:
+                        extension = 'parquet' if pa is not None else 'npz'
+                        target = ColumnWriter(re.sub(r'\.xml(\.gz)?$', 
+                                                     f'.{extension}', 
+                                                     filename),
+                                              self.columns)
+                    else:
+                        target = open(re.sub(r'\.xml(\.gz)?$', '.csv', 
+                                             filename), 'w')
+                        MARC_Parser.print_header(target, self.columns)
+                previous = num_records
+                if table:
+                    for record in output:
+                        target.append(record)
+                    num_records += len(output)
+                else:
+                    target.write(output)
+                    num_records += output.count('\n')
+                if num_records // 100000 > previous // 100000:
+                    print(f'{num_records // 1000}K records', file=sys.stderr)
+        if target is not None:
+            target.close()
         
     def parse(self, filename):
         """
@@ -175,23 +943,30 @@ class MARC_Parser(object):
             If the input file format is not supported.
         """
         if filename.endswith('.xml'):
-            source = open(filename)
+            source = open(filename, 'rb')
         elif filename.endswith('.xml.gz'):
             source = gzip.open(filename)
         else:
            raise NotImplementedError('File with unparsable extension', filename)
-        handler = MARC_Handler(sys.stdout)
-        self.sax_parser.setContentHandler(handler)       
-        self.sax_parser.parse(source)
+        with source:
+            self.run(sys.stdout, source)
         
         
   
 if __name__ == '__main__':
     if len(sys.argv)  > 1:
         parser = MARC_Parser()
-        if sys.argv[1] == '-f':
+        if sys.argv[1] == '-p' and sys.argv[2] in ('-f', '-t'):
+            parser.parse_files(sys.argv[3:], table=sys.argv[2] == '-t')
+        elif sys.argv[1] == '-f':
             for filename in sys.argv[2:]:
                 parser.parse_to_file(filename)
+        elif sys.argv[1] == '-r':
+            for filename in sys.argv[2:]:
+                parser.parse_to_file(filename, checkpoint=100000, index=True)
+        elif sys.argv[1] == '-t':
+            for filename in sys.argv[2:]:
+                parser.parse_to_table(filename)
         else:
             MARC_Parser.print_header(sys.stdout)
             for filename in sys.argv[1:]:
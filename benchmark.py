@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compare the running time of the optimized methods in div
+with the straightforward implementations they replace.
+
+Usage: benchmark.py [name ...]
+with name in the keys of the benchmarks dictionary below (all by default)
+"""
+import sys
+import random
+import zipfile
+import tracemalloc
+from io import BytesIO, StringIO
+from time import perf_counter
+from collections import Counter
+from div import Text, Tokenizer, DiversitySketch, richness, shannon_diversty_index
+from MARCXML_parser import MARC_Parser, fields, columns
+
+archive_name = 'input/sample_texts.zip'
+
+
+def read_archive(path):
+    """
+    Parameters
+    ----------
+    path : str
+        path to a zip archive.
+
+    Returns
+    -------
+    list of (str, str)
+        the name and decoded content of every member in the archive.
+    """
+    archive = zipfile.ZipFile(path, 'r')
+
+    return [(name, archive.open(name).read().decode('UTF-8'))
+            for name in archive.namelist()]
+
+
+def timeit(function, *args, repeat=3):
+    """
+    Returns
+    -------
+    tuple (float, object)
+        best running time in seconds and value returned by function(*args).
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = perf_counter()
+        value = function(*args)
+        best = min(best, perf_counter() - start)
+
+    return best, value
+
+
+def max_relative_error(a, b):
+    """
+    Returns
+    -------
+    float
+        maximal relative difference between the values in two dicts
+        with identical keys.
+    """
+    assert a.keys() == b.keys()
+
+    return max(abs(a[k] - b[k]) / abs(b[k]) for k in b)
+
+
+def reference_token_diversity(text, step):
+    """
+    Diversity curve recomputed from the whole Counter at every step
+    """
+    c = Counter()
+    stats = dict()
+    for n, token in enumerate(text.tokens(), 1):
+        c[token] += 1
+        if n % step == 0:
+            stats[n] = Text._diversity_(c.values())
+    stats[n] = Text._diversity_(c.values())
+
+    return stats
+
+
+def reference_dict_size(text, step):
+    """
+    Vocabulary growth counted token by token in a Counter
+    """
+    c = Counter()
+    stats = dict()
+    for n, token in enumerate(text.tokens(), 1):
+        c[token.lower()] += 1
+        if n % step == 0:
+            stats[n] = len(c)
+    stats[n] = len(c)
+
+    return stats
+
+
+def bench_diversity(steps=(1000, 100)):
+    texts = [(name, Text(content)) for name, content in read_archive(archive_name)]
+    for step in steps:
+        print(f'token_diversity({step})')
+        for name, text in texts:
+            t_ref, ref = timeit(reference_token_diversity, text, step)
+            t_new, new = timeit(text.token_diversity, step)
+            print(f'  {name}: {len(text)} tokens, reference {t_ref:.3f}s,',
+                  f'running {t_new:.3f}s ({t_ref / t_new:.1f}x),',
+                  f'max rel. error {max_relative_error(new, ref):.1e}')
+
+
+def memory(function, *args):
+    """
+    Returns
+    -------
+    tuple (int, object)
+        bytes allocated by function(*args) and still in use after the call,
+        and the value returned.
+    """
+    tracemalloc.start()
+    value = function(*args)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return size, value
+
+
+def bench_encoding(step=1000):
+    print('Text(encoded=False) vs Text(encoded=True)')
+    for name, content in read_archive(archive_name):
+        m_str, text = memory(Text, content)
+        m_ids, encoded = memory(Text, content, True, True)
+        t_str, _ = timeit(text.token_diversity, step)
+        t_ids, _ = timeit(encoded.token_diversity, step)
+        print(f'  {name}: memory {m_str / 2**20:.1f}MB vs {m_ids / 2**20:.1f}MB,',
+              f'token_diversity({step}) {t_str:.3f}s vs {t_ids:.3f}s')
+
+
+def bench_richness(step=1000):
+    print(f'dict_size({step})')
+    texts = read_archive(archive_name)
+    # a book-length sample with about 500K tokens
+    texts.append(('all texts x2', 2 * ' '.join(content for _, content in texts)))
+    for name, content in texts:
+        text = Text(content)
+        encoded = Text(content, encoded=True)
+        t_ref, ref = timeit(reference_dict_size, text, step)
+        t_str, new = timeit(text.dict_size, step)
+        assert new == ref
+        t_ids, new = timeit(encoded.dict_size, step)
+        assert new == ref
+        print(f'  {name}: {len(text)} tokens, reference {t_ref:.3f}s,',
+              f'str {t_str:.3f}s ({t_ref / t_str:.1f}x),',
+              f'ids {t_ids:.4f}s ({t_ref / t_ids:.1f}x)')
+
+
+def conformance(engine, samples=2000, seed=0):
+    """
+    Returns
+    -------
+    int
+        number of strings whose tokenization with engine differs from that 
+        of the reference regular expression: every code point, alone and 
+        between two letters, and random strings (built from letters, digits, 
+        separators, non-breaking and other unicode characters).
+    """
+    split = Tokenizer.engines[engine]
+    reference = Tokenizer.rex.findall
+    # all code points (except surrogates) in a single string, separated
+    # by spaces, and then between letters, which compares every character 
+    # class in one call per string
+    points = [chr(c) for c in range(sys.maxunicode + 1) 
+              if not 0xD800 <= c < 0xE000]
+    errors = 0
+    for template in ('{} ', 'a{}b '):
+        strings = [template.format(c) for c in points]
+        if split(''.join(strings)) != reference(''.join(strings)):
+            errors += sum(split(s) != reference(s) for s in strings)
+    alphabet = "aZñé1 9_-'’` .,\n²Ⅻ٣ー한\u0301"
+    rng = random.Random(seed)
+    for _ in range(samples):
+        s = ''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 40)))
+        errors += split(s) != reference(s)
+
+    return errors
+
+
+def bench_tokenizer():
+    print('Tokenizer engines')
+    content = '\n'.join(content for _, content in read_archive(archive_name))
+    size = len(content.encode('UTF-8')) / 2**20
+    reference = Tokenizer.rex.findall(content)
+    for engine, split in Tokenizer.engines.items():
+        t, tokens = timeit(split, content)
+        errors = conformance(engine)
+        print(f'  {engine}: {size / t:.1f} MB/s, {len(tokens) / t / 1e6:.2f}M tokens/s,',
+              f'identical output: {tokens == reference},',
+              f'strings differing: {errors}')
+        # every engine must tokenize exactly as the reference expression
+        assert tokens == reference, f'{engine} differs on the sample texts'
+        assert errors == 0, f'{engine} differs on {errors} random strings'
+
+
+def marc_sample(records, seed=0):
+    """
+    Returns
+    -------
+    bytes
+        a synthetic MARC-XML collection with the given number of records
+        (with Zipf-like author and subject frequencies).
+    """
+    rng = random.Random(seed)
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<collection xmlns="http://www.loc.gov/MARC21/slim">']
+    for n in range(records):
+        author = int(rng.paretovariate(1.2)) % 5000
+        lines += ['<record>', '<leader>00000nam a2200000 a 4500</leader>',
+                  f'<controlfield tag="001">ocm{n:08d}</controlfield>',
+                  f'<controlfield tag="008">{rng.randint(0, 99):02d}0101s'
+                  '    xx            000 0 eng d</controlfield>',
+                  '<datafield tag="100" ind1="1" ind2=" ">'
+                  f'<subfield code="a">Author{author}, N. &amp; M.</subfield>'
+                  '<subfield code="d">1900-1980.</subfield></datafield>',
+                  '<datafield tag="245" ind1="1" ind2="0">'
+                  f'<subfield code="a">Title {n} /</subfield></datafield>']
+        for _ in range(rng.randint(0, 3)):
+            topic = int(rng.paretovariate(1.1)) % 2000
+            lines.append('<datafield tag="650" ind1=" " ind2="0">'
+                         f'<subfield code="a">Topic{topic}</subfield>'
+                         '<subfield code="x">History.</subfield></datafield>')
+        lines += ['<datafield tag="920" ind1=" " ind2=" ">'
+                  '<subfield code="a">book</subfield></datafield>', '</record>']
+    lines.append('</collection>')
+    
+    return '\n'.join(lines).encode('UTF-8')
+
+
+def marc_output(backend, content, columns=columns):
+    """
+    Returns
+    -------
+    str
+        CSV records (with the given columns) extracted by MARC_Parser 
+        with the given backend.
+    """
+    target = StringIO()
+    MARC_Parser(backend, columns).run(target, BytesIO(content))
+
+    return target.getvalue()
+
+
+def bench_marc(records=20000):
+    print(f'MARC_Parser backends ({records} records)')
+    content = marc_sample(records)
+    reference = marc_output('sax', content)
+    for backend in MARC_Parser.backends:
+        t, output = timeit(marc_output, backend, content)
+        print(f'  {backend}: {records / t:.0f} records/s,',
+              f'{len(content) / t / 2**20:.1f} MB/s,', 
+              f'identical output: {output == reference}')
+    t, _ = timeit(marc_output, 'expat', content, tuple(fields))
+    print(f'  expat with all {len(fields)} fields: {records / t:.0f} records/s')
+
+
+def bench_sketch(errors=((0.02, 0.1), (0.01, 0.05)), seeds=5):
+    print('DiversitySketch vs exact richness and shannon_diversty_index')
+    texts = read_archive(archive_name)
+    texts.append(('all texts', '\n'.join(content for _, content in texts)))
+    for name, content in texts:
+        tokens = Text(content).tokens()
+        size, counter = memory(Counter, tokens)
+        t_exact, (R, D) = timeit(lambda: (richness(counter), 
+                                          shannon_diversty_index(tokens)))
+        print(f'  {name}: {len(tokens)} tokens, exact R={R} D={D:.1f}',
+              f'({t_exact:.2f}s, Counter {size / 2**20:.1f}MB)')
+        for richness_error, diversity_error in errors:
+            errs = list()
+            start = perf_counter()
+            for seed in range(seeds):
+                sketch = DiversitySketch(richness_error, diversity_error, seed)
+                # a stream of tokens, not a list in memory
+                tracemalloc.start()
+                sketch.update(iter(tokens))
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                errs.append((sketch.richness() / R - 1, 
+                             sketch.diversity() / D - 1))
+            t = (perf_counter() - start) / seeds
+            rms = [sum(e[k] ** 2 for e in errs) ** 0.5 / seeds ** 0.5 
+                   for k in (0, 1)]
+            kb = (sketch._registers_.nbytes + sketch._projections_.nbytes) / 2**10
+            print(f'    errors ({richness_error}, {diversity_error}):',
+                  f'{kb:.0f}KB (peak {peak / 2**20:.1f}MB), {t:.2f}s,',
+                  'RMS relative error',
+                  f'R {rms[0]:.3f}, D {rms[1]:.3f}')
+
+
+benchmarks = {
+    'diversity': bench_diversity,
+    'encoding': bench_encoding,
+    'marc': bench_marc,
+    'richness': bench_richness,
+    'sketch': bench_sketch,
+    'tokenizer': bench_tokenizer
+    }
+
+if __name__ == '__main__':
+    names = sys.argv[1:] if len(sys.argv) > 1 else benchmarks.keys()
+    for name in names:
+        benchmarks[name]()
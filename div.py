@@ -1,9 +1,17 @@
 import os, gzip
 import re
+import hashlib
+import pickle
+import sqlite3
+import zipfile
+import zlib
+from multiprocessing import Pool
 import numpy as np
 from  collections import Counter
-from math import log
+from itertools import islice
+from math import log, ceil, pi
 from scipy.optimize import curve_fit
+from scipy.special import xlogy, gammaln, logsumexp, ndtri
 
 def select(pattern, root='.'):
     """
@@ -28,38 +36,1519 @@ def select(pattern, root='.'):
     
     return list(filter(re.compile(pattern).fullmatch, sorted(paths)))                   
 
+def encode(items):
+    """
+    Replace every item with an integer identifier
+
+    Parameters
+    ----------
+    items : iterable
+        a sequence of repeatable (hashable) elements.
+
+    Returns
+    -------
+    tuple (list, numpy array of uint32)
+        the vocabulary (unique items in order of first occurrence)
+        and the array of item identifiers (indices in the vocabulary).
+    """
+    index = dict()
+    ids = np.fromiter((index.setdefault(item, len(index)) for item in items),
+                      dtype=np.uint32)
+    
+    return list(index), ids
+
+def occurrence_ranks(ids):
+    """
+    Parameters
+    ----------
+    ids : numpy array of int
+        a sequence of item identifiers.
+
+    Returns
+    -------
+    numpy array of int
+        the number of occurrences of ids[n] in ids[:n + 1], for every n.
+    """
+    order = np.argsort(ids, kind='stable')
+    sorted_ids = ids[order]
+    starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+    lengths = np.diff(np.r_[starts, len(ids)])
+    ranks = np.empty(len(ids), dtype=np.int64)
+    ranks[order] = np.arange(1, len(ids) + 1) - np.repeat(starts, lengths)
+    
+    return ranks
+
+def first_occurrences(ids, size=None):
+    """
+    Parameters
+    ----------
+    ids : numpy array of int
+        a sequence of item identifiers.
+    size : int, optional
+        the number of possible identifiers. The default is max(ids) + 1.
+
+    Returns
+    -------
+    numpy array of int
+        the position in ids of the first occurrence of every identifier
+        (len(ids) for identifiers not in ids).
+    """
+    n = len(ids)
+    if size is None:
+        size = int(ids.max(initial=0)) + 1
+    first = np.full(size, n)
+    np.minimum.at(first, ids, np.arange(n))
+    
+    return first
+
+def richness_curve(ids):
+    """
+    Parameters
+    ----------
+    ids : numpy array of int
+        a sequence of item identifiers.
+
+    Returns
+    -------
+    numpy array of int
+        number of unique items in ids[:n] for n = 1, 2, ... len(ids).
+    """
+    n = len(ids)
+    first = first_occurrences(ids)
+    marks = np.zeros(n, dtype=np.int64)
+    marks[first[first < n]] = 1
+    
+    return np.cumsum(marks)
+
+def diversity_curve(ids):
+    """
+    Parameters
+    ----------
+    ids : numpy array of int
+        a sequence of item identifiers.
+
+    Returns
+    -------
+    numpy array of float
+        Shannon diversity index of ids[:n] for n = 1, 2, ... len(ids).
+    """
+    ranks = occurrence_ranks(ids)
+    flogf = xlogy(ranks, ranks) - xlogy(ranks - 1, ranks - 1)
+    n = np.arange(1, len(ids) + 1)
+    entropy = np.log2(n) - np.cumsum(flogf) / log(2) / n
+    
+    return 2 ** entropy
+
+def hill_numbers(counts, orders=(0, 1, 2)):
+    """
+    Hill numbers (effective number of types) of several orders q:
+    q = 0 is the richness, q = 1 the Shannon diversity index (2 ** entropy)
+    and q = 2 the inverse Simpson index.
+
+    Parameters
+    ----------
+    counts : array of int
+        the number of occurrences of every type (zeros are ignored);
+        a 2-dimensional array contains one collection per row.
+    orders : iterable of float, optional
+        the orders q. The default is (0, 1, 2).
+
+    Returns
+    -------
+    numpy array of float
+        the Hill number of every order q (along the last axis).
+    """
+    counts = np.asarray(counts, dtype=float)
+    total = counts.sum(axis=-1)
+    p = counts / total[..., np.newaxis]
+    present = counts > 0
+    res = list()
+    for q in orders:
+        if q == 0:
+            res.append(np.count_nonzero(present, axis=-1).astype(float))
+        elif q == 1:
+            flogf = xlogy(counts, counts).sum(axis=-1) / log(2)
+            res.append(2 ** (np.log2(total) - flogf / total))
+        else:
+            pq = np.power(p, q, where=present, out=np.zeros_like(p))
+            res.append(pq.sum(axis=-1) ** (1 / (1 - q)))
+    
+    return np.stack(res, axis=-1)
+
+def hill_curves(ids, orders=(0, 1, 2)):
+    """
+    Parameters
+    ----------
+    ids : numpy array of int
+        a sequence of item identifiers.
+    orders : iterable of float, optional
+        the orders q. The default is (0, 1, 2).
+
+    Returns
+    -------
+    numpy array of float
+        the Hill numbers of ids[:n] for n = 1, 2, ... len(ids) (rows) 
+        and every order q (columns).
+    """
+    ranks = occurrence_ranks(ids)
+    n = np.arange(1, len(ids) + 1)
+    res = list()
+    for q in orders:
+        if q == 0:
+            res.append(np.cumsum(ranks == 1).astype(float))
+        elif q == 1:
+            res.append(diversity_curve(ids))
+        else:
+            # sum of f ** q updated as every occurrence increases f by one
+            fq = np.cumsum(ranks ** float(q) - (ranks - 1) ** float(q))
+            res.append((fq / n ** float(q)) ** (1 / (1 - q)))
+    
+    return np.stack(res, axis=-1)
+
+def rarefaction(counts, sizes):
+    """
+    Expected richness and diversity of random samples (without replacement) 
+    of a collection, computed in closed form from the hypergeometric 
+    distribution of the number of occurrences of every type in the sample.
+
+    Parameters
+    ----------
+    counts : array of int
+        the number of occurrences of every type in the collection.
+    sizes : iterable of int
+        the sample sizes (at most the collection size).
+
+    Returns
+    -------
+    tuple (numpy array of float, numpy array of float)
+        the expected richness and the diversity of the expected Shannon 
+        entropy (2 ** E[H]) for every sample size.
+        
+    Raises
+    ------
+    ValueError
+        If a size is not between 1 and the collection size.
+    """
+    counts = np.asarray(counts)
+    f, w = np.unique(counts[counts > 0], return_counts=True)
+    N = int(np.dot(f, w))
+    sizes = list(map(int, sizes))
+    if any(n < 1 or n > N for n in sizes):
+        raise ValueError(f'Sample sizes must be between 1 and {N}')
+    lC = lambda a, b: gammaln(a + 1) - gammaln(b + 1) - gammaln(a - b + 1)
+    R = list()
+    D = list()
+    for n in sizes:
+        # probability that a type with f occurrences is absent from the sample
+        absent = np.zeros(len(f))
+        some = N - f >= n
+        absent[some] = np.exp(lC(N - f[some], n) - lC(N, n))
+        R.append(np.dot(w, 1 - absent))
+        # expected value of k * log2(k), k = occurrences of a type in sample
+        kmax = np.minimum(f, n)
+        group = np.repeat(np.arange(len(f)), kmax)
+        k = np.arange(1, len(group) + 1) - np.repeat(np.cumsum(kmax) - kmax, kmax)
+        fg = f[group]
+        pmf = np.zeros(len(k))
+        valid = n - k <= N - fg
+        kv, fv = k[valid], fg[valid]
+        pmf[valid] = np.exp(lC(fv, kv) + lC(N - fv, n - kv) - lC(N, n))
+        flogf = np.dot(w[group], pmf * k * np.log2(k))
+        D.append(2 ** (log(n, 2) - flogf / n))
+    
+    return np.array(R), np.array(D)
+
+def rarefaction_mc(counts, sizes, permutations=100, seed=None, batch=10):
+    """
+    Mean richness and diversity of the first n items in random permutations 
+    of a collection (Monte-Carlo rarefaction).
+
+    Parameters
+    ----------
+    counts : array of int
+        the number of occurrences of every type in the collection.
+    sizes : iterable of int
+        the sample sizes (at most the collection size).
+    permutations : int, optional
+        number of random permutations. The default is 100.
+    seed : int, optional
+        seed for the random generator. The default is None.
+    batch : int, optional
+        number of permutations processed at once. The default is 10.
+
+    Returns
+    -------
+    tuple (numpy array of float, numpy array of float)
+        the average richness and diversity (2 to the average entropy) 
+        for every sample size.
+        
+    Raises
+    ------
+    ValueError
+        If a size is not between 1 and the collection size.
+    """
+    rng = np.random.default_rng(seed)
+    counts = np.asarray(counts)
+    ids = np.repeat(np.arange(len(counts)), counts)
+    N = len(ids)
+    positions = np.asarray(list(sizes), dtype=np.int64) - 1
+    if np.any((positions < 0) | (positions >= N)):
+        raise ValueError(f'Sample sizes must be between 1 and {N}')
+    R = np.zeros(len(positions))
+    H = np.zeros(len(positions))
+    for start in range(0, permutations, batch):
+        b = min(batch, permutations - start)
+        # identifiers are made distinct across permutations (rows),
+        # so that occurrences are ranked in every row independently
+        rows = rng.permuted(np.tile(ids, (b, 1)), axis=1)
+        rows += np.arange(b)[:, np.newaxis] * len(counts)
+        ranks = occurrence_ranks(rows.ravel()).reshape(b, N)
+        richness = np.cumsum(ranks == 1, axis=1)
+        flogf = np.cumsum(xlogy(ranks, ranks) - xlogy(ranks - 1, ranks - 1), 
+                          axis=1) / log(2)
+        n = positions + 1
+        R += richness[:, positions].sum(axis=0)
+        # entropies are averaged, as in rarefaction (which returns 2**E[H])
+        H += (np.log2(n) - flogf[:, positions] / n).sum(axis=0)
+    
+    return R / permutations, 2 ** (H / permutations)
+
+def assemblage(counts):
+    """
+    Relative abundances of the types in the assemblage a collection was
+    drawn from, as estimated by Chao & Jost (2015): the observed abundances 
+    are adjusted to the estimated sample coverage and the missing 
+    probability is shared by the undetected types (as many as the Chao1 
+    estimate of their number).
+
+    Parameters
+    ----------
+    counts : array of int
+        the number of occurrences of every type in the collection.
+
+    Returns
+    -------
+    tuple (numpy array of float, int)
+        the probability of every observed type (with positive count) and 
+        the number of undetected types, which share equally the 
+        remaining probability.
+    """
+    counts = np.asarray(counts)
+    counts = counts[counts > 0]
+    n = int(counts.sum())
+    p = counts / n
+    f1 = np.count_nonzero(counts == 1)
+    f2 = np.count_nonzero(counts == 2)
+    if f2 > 0:
+        f0 = (n - 1) / n * f1 ** 2 / (2 * f2)
+    else:
+        f0 = (n - 1) / n * f1 * (f1 - 1) / 2
+    if f0 == 0:
+        return p, 0
+    # coverage deficit (probability of the undetected types)
+    deficit = f1 / n * n * f0 / (n * f0 + f1)
+    w = deficit / np.dot(p, (1 - p) ** n)
+    
+    return p * (1 - w * (1 - p) ** n), ceil(f0)
+
+def bootstrap(counts, statistic='diversity', resamples=1000, alpha=0.05, 
+              method='normal', adjusted=True, seed=None, batch=100):
+    """
+    Bootstrap confidence interval for a statistic of a collection: 
+    resamples are multinomial draws of the type counts (equivalent to 
+    sampling the items with replacement), by default from the assemblage
+    estimated with the undetected types (see assemblage).
+    
+    Richness and diversity (and, in the opposite direction, dr_rate) are 
+    biased in samples, since they miss rare types: even with adjusted 
+    resamples, the 'percentile' and 'basic' intervals may not contain 
+    the estimate, and the 'normal' interval (as in Chao & Jost, 2015) 
+    is to be preferred.
+
+    Parameters
+    ----------
+    counts : array of int
+        the number of occurrences of every type in the collection.
+    statistic : str or callable, optional
+        'richness', 'diversity' (Shannon diversity index), 'dr_rate' or 
+        a function mapping a 2-dimensional array of counts (one resample 
+        per row, zeros included) to an array with one value per row. 
+        The default is 'diversity'.
+    resamples : int, optional
+        number of bootstrap resamples. The default is 1000.
+    alpha : float, optional
+        the confidence level is 1 - alpha. The default is 0.05.
+    method : str, optional
+        'normal' (the estimate plus or minus the normal quantile times the 
+        bootstrap standard error), 'percentile' (quantiles of the resampled 
+        statistic) or 'basic' (quantiles reflected around the estimate). 
+        The default is 'normal'.
+    adjusted : boolean, optional
+        if True, resample the coverage-adjusted assemblage, otherwise the 
+        observed relative abundances. The default is True.
+    seed : int, optional
+        seed for the random generator. The default is None.
+    batch : int, optional
+        number of resamples drawn at once. The default is 100.
+
+    Returns
+    -------
+    tuple of float
+        the statistic for the collection and the bounds of the 
+        confidence interval.
+        
+    Raises
+    ------
+    NotImplementedError
+        If the method is not supported.
+    """
+    if method not in ('normal', 'percentile', 'basic'):
+        raise NotImplementedError('Unsupported bootstrap interval', method)
+    if statistic == 'richness':
+        statistic = lambda c: hill_numbers(c, (0,))[..., 0]
+    elif statistic == 'diversity':
+        statistic = lambda c: hill_numbers(c, (1,))[..., 0]
+    elif statistic == 'dr_rate':
+        def statistic(c):
+            h = hill_numbers(c, (0, 1))
+            return h[..., 1] / h[..., 0]
+    
+    rng = np.random.default_rng(seed)
+    counts = np.asarray(counts)
+    counts = counts[counts > 0]
+    total = int(counts.sum())
+    if adjusted:
+        p, undetected = assemblage(counts)
+    else:
+        p, undetected = counts / total, 0
+    # the items drawn from undetected types fall in a last pool
+    p = np.r_[p, max(0, 1 - p.sum())] if undetected else p
+    values = list()
+    for start in range(0, resamples, batch):
+        size = min(batch, resamples - start)
+        draws = rng.multinomial(total, p / p.sum(), size=size)
+        if undetected:
+            # the pool is split among equiprobable undetected types
+            # (only those drawn, padded with zeros)
+            hits = [np.unique(rng.integers(undetected, size=m), 
+                              return_counts=True)[1] for m in draws[:, -1]]
+            width = max(map(len, hits))
+            extra = np.zeros((size, width), dtype=draws.dtype)
+            for row, h in zip(extra, hits):
+                row[:len(h)] = h
+            draws = np.hstack((draws[:, :-1], extra))
+        values.append(statistic(draws))
+    values = np.concatenate(values)
+    # resamples where the statistic is undefined (nan) are ignored
+    values = values[~np.isnan(values)]
+    estimate = float(statistic(counts[np.newaxis])[0])
+    if method == 'normal':
+        error = ndtri(1 - alpha / 2) * values.std(ddof=1)
+        low, high = estimate - error, estimate + error
+    else:
+        low, high = np.quantile(values, (alpha / 2, 1 - alpha / 2))
+    if method == 'basic':
+        low, high = 2 * estimate - high, 2 * estimate - low
+    
+    return estimate, float(low), float(high)
+
+def sample(values, step):
+    """
+    Parameters
+    ----------
+    values : numpy array
+        a statistic evaluated after n = 1, 2, ... items.
+    step : int
+        the sampling interval.
+
+    Returns
+    -------
+    dict 
+        the values after n items with n a multiple of step
+        (or the total number of items).
+    """
+    positions = list(range(step, len(values) + 1, step))
+    if not positions or positions[-1] != len(values):
+        positions.append(len(values))
+    
+    return dict(zip(positions, values[np.array(positions) - 1].tolist()))
+
 class Tokenizer():
     """
-    Splits text into tokens
-    A token is a sequence of contiguous alphanumeric characters with, 
-    at least, one letter character 
-    (for example, 1988 is not a valid token but B747 is). 
-    Tokens may contain non-breaking characters such as dashes or apostrophes
+    Splits text into tokens
+    A token is a sequence of contiguous alphanumeric characters with, 
+    at least, one letter character 
+    (for example, 1988 is not a valid token but B747 is). 
+    Tokens may contain non-breaking characters such as dashes or apostrophes
+    """
+    char = '[^\W\d_]'
+    alphanum = '[^\W_]'
+    nonbreak = "[-'’`]"
+    prefix = f'(?:{alphanum}+{nonbreak})'
+    postfix = f'(?:{nonbreak}{alphanum}+)'
+    pattern = f'{prefix}*{alphanum}*{char}{alphanum}*{postfix}*'
+    rex = re.compile(pattern)    
+    # identifies the tokenization rules (for cached tokenizations)
+    version = hashlib.sha1(pattern.encode('utf-8')).hexdigest()[:12]
+    # characters which cannot be part of a token 
+    breaking = re.compile("_|[^\\w'’`-]")
+    # maximal sequences of alphanumeric characters joined by single 
+    # non-breaking characters: tokens are those containing a letter
+    try:
+        chain = re.compile(f'{alphanum}++(?:{nonbreak}{alphanum}++)*+')
+    except re.error: # possessive quantifiers require Python 3.11
+        chain = re.compile(f'{alphanum}+(?:{nonbreak}{alphanum}+)*')
+    letter = re.compile(char)
+    engine = 're'
+        
+    @staticmethod
+    def split(text):
+        """
+        Tokenize text
+
+        Parameters
+        ----------
+        text : str 
+            input text.
+
+        Returns
+        -------
+        list of str
+            list of tokens in text.
+        """
+        return Tokenizer.engines[Tokenizer.engine](text)
+    
+    @staticmethod
+    def scan(text):
+        """
+        Tokenize text in a single pass without backtracking: 
+        every chain of alphanumeric characters joined by single non-breaking 
+        characters is a token if it contains a letter. 
+        The output is identical to Tokenizer.rex.findall(text).
+        
+        Parameters
+        ----------
+        text : str 
+            input text.
+
+        Returns
+        -------
+        list of str
+            list of tokens in text.
+        """
+        letter = Tokenizer.letter.search
+        
+        return [token for token in Tokenizer.chain.findall(text) 
+                if token.isalpha() or letter(token)]
+    
+    @staticmethod
+    def use(engine):
+        """
+        Select the tokenization engine employed by Tokenizer.split
+
+        Parameters
+        ----------
+        engine : str
+            One of the keys in Tokenizer.engines: 're' (the default) 
+            or 'scanner'.
+
+        Raises
+        ------
+        NotImplementedError
+            If the engine is not available.
+        """
+        if engine not in Tokenizer.engines:
+            raise NotImplementedError(engine)
+        Tokenizer.engine = engine
+    
+    @staticmethod
+    def stream(file, chunk_size=2**20):
+        """
+        Tokenize the content of a file reading fixed-size chunks.
+        Tokens are never split at chunk boundaries, since every chunk is 
+        only tokenized up to its last breaking character and the remainder 
+        is prepended to the next chunk.
+
+        Parameters
+        ----------
+        file : file object
+            input text stream.
+        chunk_size : int, optional
+            number of characters read at once. The default is 2**20.
+
+        Yields
+        ------
+        str
+            the tokens in the file.
+        """
+        tail = ''
+        for chunk in iter(lambda: file.read(chunk_size), ''):
+            buffer = tail + chunk
+            m = Tokenizer.breaking.search(buffer[::-1])
+            if m:
+                end = len(buffer) - m.start()
+                yield from Tokenizer.split(buffer[:end])
+                tail = buffer[end:]
+            else:
+                tail = buffer
+                
+        yield from Tokenizer.split(tail)
+    
+
+Tokenizer.engines = {'re': Tokenizer.rex.findall, 'scanner': Tokenizer.scan}
+    
+
+class TokenCache():
+    """
+    Persistent storage of tokenized texts (vocabulary and token identifiers),
+    keyed by the hash of their content, the lowercase flag and 
+    the tokenizer version. The least recently used entries are removed 
+    when the total size exceeds the limit.
+    """
+    def __init__(self, folder, max_size=2**30):
+        """
+        Parameters
+        ----------
+        folder : str
+            The folder where tokenizations are saved (created if needed).
+        max_size : int, optional
+            Maximal size of the cache in bytes. The default is 2**30.
+        """
+        self.folder = folder
+        self.max_size = max_size
+        os.makedirs(folder, exist_ok=True)
+        
+    def key(self, content, lowercase):
+        """
+        Returns
+        -------
+        str
+            the hexadecimal key for this content and tokenization settings.
+        """
+        h = hashlib.sha1(f'{Tokenizer.version}:{lowercase:d}:'.encode('utf-8'))
+        h.update(content.encode('utf-8'))
+        
+        return h.hexdigest()
+    
+    def path(self, key):
+        """
+        Returns
+        -------
+        str
+            the file where the tokenization with this key is saved.
+        """
+        return os.path.join(self.folder, f'{key}.npz')
+    
+    def load(self, key):
+        """
+        Parameters
+        ----------
+        key : str
+            the entry key.
+
+        Returns
+        -------
+        tuple (list of str, numpy array of uint32) or None
+            the vocabulary and token identifiers, 
+            or None if the key is not in cache.
+        """
+        path = self.path(key)
+        try:
+            with np.load(path) as data:
+                vocabulary = data['vocabulary'].tobytes().decode('utf-8')
+                ids = data['ids']
+            os.utime(path)
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+        
+        return (vocabulary.split('\n') if vocabulary else list()), ids
+    
+    def save(self, key, vocabulary, ids):
+        """
+        Store a tokenization and evict old entries if the cache is too large.
+        The vocabulary is stored as newline-separated UTF-8 bytes 
+        (tokens never contain whitespace).
+
+        Parameters
+        ----------
+        key : str
+            the entry key.
+        vocabulary : list of str
+            the token types.
+        ids : numpy array of uint32
+            the token identifiers (indices in the vocabulary).
+        """
+        vocabulary = '\n'.join(vocabulary).encode('utf-8')
+        tmp = f'{self.path(key)}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as file:
+            np.savez(file, ids=ids, 
+                     vocabulary=np.frombuffer(vocabulary, dtype=np.uint8))
+        os.replace(tmp, self.path(key))
+        self.evict()
+        
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache size 
+        does not exceed max_size.
+        """
+        entries = list()
+        for entry in os.scandir(self.folder):
+            if entry.name.endswith('.npz'):
+                try:
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                except FileNotFoundError:
+                    pass
+        
+        size = sum(s for _, s, _ in entries)
+        for _, s, path in sorted(entries):
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= s
+            
+
+class RunningDiversity():
+    """
+    Shannon diversity of a changing collection of items, 
+    updated in constant time every time an item is added or removed
+    """
+    # table of f * log2(f) for small frequencies f
+    _flogf_ = [0.0]
+    
+    @staticmethod
+    def flogf(f):
+        """
+        Parameters
+        ----------
+        f : int
+            A frequency (absolute number of occurrences).
+
+        Returns
+        -------
+        float
+            f * log2(f), tabulated for efficiency.
+        """
+        table = RunningDiversity._flogf_
+        while len(table) <= f:
+            n = len(table)
+            table.append(n * log(n, 2))
+            
+        return table[f]
+        
+    def __init__(self):
+        self._counter_ = Counter()
+        self._total_ = 0
+        self._sum_ = 0.0   # sum of f * log2(f) over all item frequencies f
+        
+    def __len__(self):
+        """
+        Returns
+        -------
+        int
+            number of items added so far.
+        """
+        return self._total_
+    
+    def add(self, item):
+        """
+        Add one occurrence of item to the collection
+
+        Parameters
+        ----------
+        item : hashable
+            the item added.
+        """
+        f = self._counter_[item]
+        self._counter_[item] = f + 1
+        self._total_ += 1
+        self._sum_ += RunningDiversity.flogf(f + 1) - RunningDiversity.flogf(f)
+    
+    def remove(self, item):
+        """
+        Remove one occurrence of item from the collection
+
+        Parameters
+        ----------
+        item : hashable
+            the item removed (it must be in the collection).
+        """
+        f = self._counter_[item]
+        if f == 1:
+            del self._counter_[item]
+        else:
+            self._counter_[item] = f - 1
+        self._total_ -= 1
+        self._sum_ += RunningDiversity.flogf(f - 1) - RunningDiversity.flogf(f)
+        
+    def richness(self):
+        """
+        Returns
+        -------
+        int
+            number of unique items in the collection.
+        """
+        return len(self._counter_)
+    
+    def diversity(self):
+        """
+        Returns
+        -------
+        float
+            Shannon diversity index of the collection.
+        """
+        total = self._total_
+        entropy = log(total, 2) - self._sum_ / total 
+        
+        return 2 ** entropy
+    
+
+class CountSummary():
+    """
+    Number of occurrences of every item in a collection of strings, 
+    which can be merged with the summaries of other parts of the collection 
+    (computed, for instance, by different processes or machines) and 
+    serialized to compact bytes. Statistics are computed from the sorted 
+    frequencies, so merged summaries give exactly the same results as 
+    a summary of the whole collection.
+    """
+    _magic_ = b'DLCS'
+    
+    def __init__(self, items=()):
+        """
+        Parameters
+        ----------
+        items : iterable of str, optional
+            the items in the collection. The default is ().
+        """
+        self._counter_ = Counter(items)
+        
+    @staticmethod
+    def from_counts(counts):
+        """
+        Parameters
+        ----------
+        counts : dict
+            the number of occurrences of every item.
+
+        Returns
+        -------
+        CountSummary
+            the summary of a collection with the given counts.
+        """
+        summary = CountSummary()
+        summary._counter_.update(counts)
+        
+        return summary
+        
+    def __len__(self):
+        """
+        Returns
+        -------
+        int
+            number of items (occurrences) in the collection.
+        """
+        return sum(self._counter_.values())
+    
+    def __eq__(self, other):
+        return isinstance(other, CountSummary) \
+            and +self._counter_ == +other._counter_
+    
+    def update(self, items):
+        """
+        Add items to the collection
+
+        Parameters
+        ----------
+        items : iterable of str
+            the items added.
+        """
+        self._counter_.update(items)
+        
+    def merge(self, *others):
+        """
+        Add the counts in other summaries to this one
+
+        Parameters
+        ----------
+        *others : CountSummary
+            the summaries merged.
+
+        Returns
+        -------
+        CountSummary
+            this summary.
+        """
+        for other in others:
+            self._counter_.update(other._counter_)
+            
+        return self
+    
+    def counts(self):
+        """
+        Returns
+        -------
+        numpy array of int
+            number of occurrences of every item, in increasing order.
+        """
+        counts = np.fromiter(self._counter_.values(), dtype=np.int64, 
+                             count=len(self._counter_))
+        
+        return np.sort(counts[counts > 0])
+    
+    def richness(self):
+        """
+        Returns
+        -------
+        int
+            number of unique items in the collection.
+        """
+        return len(self.counts())
+    
+    def diversity(self):
+        """
+        Returns
+        -------
+        float
+            Shannon diversity index of the collection.
+        """
+        return float(self.hill_numbers((1,))[0])
+    
+    def hill_numbers(self, orders=(0, 1, 2)):
+        """
+        Parameters
+        ----------
+        orders : iterable of float, optional
+            the orders q. The default is (0, 1, 2).
+
+        Returns
+        -------
+        numpy array of float
+            the Hill number of every order q (see hill_numbers).
+        """
+        return hill_numbers(self.counts(), orders)
+    
+    def dr_rate(self):
+        """
+        Returns
+        -------
+        float
+            ratio between Shannon diversity and richness of the collection.
+        """
+        q0, q1 = self.hill_numbers((0, 1))
+        
+        return q1 / q0
+    
+    def to_bytes(self):
+        """
+        Returns
+        -------
+        bytes
+            compressed serialization of the summary: the items sorted 
+            (as UTF-8 strings with their lengths) and their counts, 
+            stored as unsigned integers of the smallest size needed.
+        """
+        items = sorted(item for item, f in self._counter_.items() if f > 0)
+        counts = np.array([self._counter_[item] for item in items], 
+                          dtype=np.uint64)
+        dtype = np.min_scalar_type(counts.max() if len(counts) else 0)
+        encoded = [item.encode('utf-8') for item in items]
+        lengths = np.array(list(map(len, encoded)), dtype=np.uint32)
+        header = np.array([len(items)], dtype=np.uint64).tobytes()
+        data = b''.join([header, dtype.char.encode(), lengths.tobytes(), 
+                         counts.astype(dtype).tobytes()] + encoded)
+        
+        return CountSummary._magic_ + zlib.compress(data)
+    
+    @staticmethod
+    def from_bytes(data):
+        """
+        Parameters
+        ----------
+        data : bytes
+            a summary serialized with to_bytes.
+
+        Raises
+        ------
+        ValueError
+            If the data is not a serialized summary.
+
+        Returns
+        -------
+        CountSummary
+            the deserialized summary.
+        """
+        magic = CountSummary._magic_
+        if not data.startswith(magic):
+            raise ValueError('Invalid count summary')
+        data = zlib.decompress(data[len(magic):])
+        size = int(np.frombuffer(data, dtype=np.uint64, count=1)[0])
+        dtype = np.dtype(chr(data[8]))
+        start = 9
+        lengths = np.frombuffer(data, dtype=np.uint32, count=size, offset=start)
+        start += lengths.nbytes
+        counts = np.frombuffer(data, dtype=dtype, count=size, offset=start)
+        start += counts.nbytes
+        ends = (start + np.cumsum(lengths, dtype=np.int64)).tolist()
+        items = [data[begin:end].decode('utf-8') 
+                 for begin, end in zip([start] + ends[:-1], ends)]
+        
+        return CountSummary.from_counts(dict(zip(items, counts.tolist())))
+    
+
+class DiversitySketch():
+    """
+    Approximate richness and Shannon diversity of an unbounded stream of
+    items in fixed memory: a HyperLogLog counter estimates the number of
+    unique items, and the projections of the item frequencies on maximally
+    skewed 1-stable random variables (Clifford & Cosma, 2013) the entropy.
+    Sketches of parts of a stream can be merged if they were created with 
+    the same parameters.
+    """
+    def __init__(self, richness_error=0.01, diversity_error=0.05, seed=0):
+        """
+        Parameters
+        ----------
+        richness_error : float, optional
+            relative standard error of the richness, which sets the number 
+            of HyperLogLog registers to (1.04 / richness_error) ** 2 
+            (rounded up to a power of two). The default is 0.01.
+        diversity_error : float, optional
+            relative standard error of the diversity, which sets the number
+            of projections to 3 / diversity_error ** 2. The default is 0.05.
+        seed : int, optional
+            seed of the item hash function. The default is 0.
+        """
+        self._bits_ = max(4, ceil(2 * np.log2(1.04 / richness_error)))
+        self._registers_ = np.zeros(2 ** self._bits_, dtype=np.uint8)
+        self._projections_ = np.zeros(ceil(3 / diversity_error ** 2))
+        self._total_ = 0
+        self._seed_ = seed
+        
+    def __len__(self):
+        """
+        Returns
+        -------
+        int
+            number of items (occurrences) added so far.
+        """
+        return int(self._total_)
+    
+    # 64-bit hash of every item
+    def _hash_(self, items):
+        key = self._seed_.to_bytes(8, 'little')
+        digest = lambda item: hashlib.blake2b(str(item).encode('utf-8'), 
+                                              digest_size=8, key=key).digest()
+        
+        return np.array([int.from_bytes(digest(item), 'little') 
+                         for item in items], dtype=np.uint64)
+        
+    # splitmix64 finalizer (arithmetic modulo 2 ** 64)
+    @staticmethod
+    def _mix_(z):
+        z = z + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        
+        return z ^ (z >> np.uint64(31))
+    
+    # maximally skewed 1-stable variables with scale pi / 2, 
+    # one row (as many as projections) per hash value
+    def _stable_(self, hashes):
+        j = np.arange(len(self._projections_), dtype=np.uint64)
+        z = hashes[:, np.newaxis] + j * np.uint64(0xD1B54A32D192ED03)
+        uniform = lambda z: ((self._mix_(z) >> np.uint64(11)) + 0.5) * 2.0 ** -53
+        V = pi * (uniform(z) - 0.5)
+        W = -np.log(uniform(z ^ np.uint64(0xA0761D6478BD642F)))
+        h = pi / 2
+        
+        return (h - V) * np.tan(V) + np.log(h * W * np.cos(V) / (h - V)) \
+            - log(h)
+    
+    def update(self, items, block=2**16):
+        """
+        Add items to the stream, read in blocks (only the items in one 
+        block are counted at a time)
+
+        Parameters
+        ----------
+        items : iterable
+            the items added.
+        block : int, optional
+            number of items read at a time. The default is 2**16.
+        """
+        items = iter(items)
+        while True:
+            counts = Counter(islice(items, block))
+            if not counts:
+                break
+            self._add_(list(counts.keys()), list(counts.values()))
+        
+    def update_counts(self, counts, block=2**16):
+        """
+        Add several occurrences of items to the stream
+
+        Parameters
+        ----------
+        counts : dict or iterable of (item, int)
+            the number of occurrences added for every item 
+            (an item may appear in several pairs).
+        block : int, optional
+            number of pairs read at a time. The default is 2**16.
+        """
+        pairs = iter(counts.items() if isinstance(counts, dict) else counts)
+        while True:
+            chunk = list(islice(pairs, block))
+            if not chunk:
+                break
+            self._add_(*zip(*chunk))
+            
+    # add occurrences of items (sequences of items and their counts)
+    def _add_(self, items, counts):
+        hashes = self._hash_(items)
+        weights = np.array(counts, dtype=float)
+        # HyperLogLog: register selected by the first bits, 
+        # position of the leftmost 1 in the remaining bits
+        free = 64 - self._bits_
+        index = (hashes >> np.uint64(free)).astype(np.int64)
+        rest = hashes & np.uint64(2 ** free - 1)
+        powers = np.uint64(1) << np.arange(free, dtype=np.uint64)
+        rank = free + 1 - np.searchsorted(powers, rest, side='right')
+        np.maximum.at(self._registers_, index, rank.astype(np.uint8))
+        # entropy projections, in blocks of bounded size
+        size = max(1, 2 ** 18 // len(self._projections_))
+        for start in range(0, len(hashes), size):
+            block = slice(start, start + size)
+            self._projections_ += weights[block] @ self._stable_(hashes[block])
+        self._total_ += weights.sum()
+        
+    def merge(self, *others):
+        """
+        Add the streams summarized by other sketches to this one
+
+        Parameters
+        ----------
+        *others : DiversitySketch
+            sketches with the same parameters.
+
+        Raises
+        ------
+        ValueError
+            If the parameters of the sketches differ.
+
+        Returns
+        -------
+        DiversitySketch
+            this sketch.
+        """
+        for other in others:
+            if (other._bits_, len(other._projections_), other._seed_) \
+                    != (self._bits_, len(self._projections_), self._seed_):
+                raise ValueError('Sketches with different parameters')
+            np.maximum(self._registers_, other._registers_, 
+                       out=self._registers_)
+            self._projections_ += other._projections_
+            self._total_ += other._total_
+            
+        return self
+        
+    def richness(self):
+        """
+        Returns
+        -------
+        float
+            estimated number of unique items in the stream.
+        """
+        m = len(self._registers_)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(2.0 ** -self._registers_.astype(float))
+        zeros = np.count_nonzero(self._registers_ == 0)
+        if estimate <= 2.5 * m and zeros > 0:
+            # linear counting for small cardinalities
+            estimate = m * log(m / zeros)
+            
+        return float(estimate)
+    
+    def diversity(self):
+        """
+        Returns
+        -------
+        float
+            estimated Shannon diversity index of the stream.
+        """
+        k = len(self._projections_)
+        entropy = log(k) - logsumexp(self._projections_ / self._total_)
+        
+        return float(np.exp(entropy))
+    
+    def dr_rate(self):
+        """
+        Returns
+        -------
+        float
+            estimated ratio between Shannon diversity and richness.
+        """
+        return self.diversity() / self.richness()
+    
+
+class SQLiteDict():
+    """
+    Dictionary stored in a table of a sqlite database (with pickled values,
+    which cannot be None). Only the entries used are read, and they are kept
+    in memory (including in-place changes) until flush writes them back.
     """
-    char = '[^\W\d_]'
-    alphanum = '[^\W_]'
-    nonbreak = "[-'’`]"
-    prefix = f'(?:{alphanum}+{nonbreak})'
-    postfix = f'(?:{nonbreak}{alphanum}+)'
-    pattern = f'{prefix}*{alphanum}*{char}{alphanum}*{postfix}*'
-    rex = re.compile(pattern)    
+    def __init__(self, db, table):
+        """
+        Parameters
+        ----------
+        db : sqlite3.Connection
+            the database.
+        table : str
+            the table name (created if needed).
+        """
+        self.db = db
+        self.table = table
+        db.execute(f'CREATE TABLE IF NOT EXISTS {table} '
+                   '(key PRIMARY KEY, value BLOB)')
+        db.execute('CREATE TABLE IF NOT EXISTS lengths '
+                   '(name PRIMARY KEY, length INTEGER)')
+        row = db.execute('SELECT length FROM lengths WHERE name = ?', 
+                         (table,)).fetchone()
+        self._length_ = row[0] if row else 0
+        self._cache_ = dict()   # key -> value (None if not stored)
         
     @staticmethod
-    def split(text):
+    def create(db, table, items):
         """
-        Tokenize text
+        Parameters
+        ----------
+        db : sqlite3.Connection
+            the database.
+        table : str
+            the name of a new table.
+        items : iterable of (key, value)
+            the dictionary content.
+
+        Returns
+        -------
+        SQLiteDict
+            the table with all items written in a single pass.
+        """
+        store = SQLiteDict(db, table)
+        cursor = db.executemany(f'INSERT INTO {table} VALUES (?, ?)', 
+                                ((key, pickle.dumps(value)) 
+                                 for key, value in items))
+        store._length_ = max(cursor.rowcount, 0)
+        db.execute('REPLACE INTO lengths VALUES (?, ?)', 
+                   (table, store._length_))
+        
+        return store
+        
+    # the value stored with key (None if missing), read once
+    def _get_(self, key):
+        if key not in self._cache_:
+            row = self.db.execute(f'SELECT value FROM {self.table} '
+                                  'WHERE key = ?', (key,)).fetchone()
+            self._cache_[key] = pickle.loads(row[0]) if row else None
+            
+        return self._cache_[key]
+    
+    def __len__(self):
+        return self._length_
+    
+    def __contains__(self, key):
+        return self._get_(key) is not None
+    
+    def __getitem__(self, key):
+        value = self._get_(key)
+        if value is None:
+            raise KeyError(key)
+            
+        return value
+    
+    def __setitem__(self, key, value):
+        if key not in self:
+            self._length_ += 1
+        self._cache_[key] = value
+        
+    def __delitem__(self, key):
+        self.pop(key)
+        
+    def get(self, key, default=None):
+        value = self._get_(key)
+        
+        return default if value is None else value
+    
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+            
+        return self._cache_[key]
+    
+    def pop(self, key):
+        value = self[key]
+        self._cache_[key] = None
+        self._length_ -= 1
+        
+        return value
+    
+    def items(self):
+        for key, value in self.db.execute(f'SELECT key, value '
+                                          f'FROM {self.table}'):
+            if key not in self._cache_:
+                yield key, pickle.loads(value)
+        for key, value in list(self._cache_.items()):
+            if value is not None:
+                yield key, value
+                
+    def values(self):
+        return (value for _, value in self.items())
+    
+    def flush(self):
+        """
+        Write the entries read or changed to the database
+        (the transaction is not committed).
+        """
+        self.db.executemany(f'REPLACE INTO {self.table} VALUES (?, ?)',
+                            ((key, pickle.dumps(value)) 
+                             for key, value in self._cache_.items() 
+                             if value is not None))
+        self.db.executemany(f'DELETE FROM {self.table} WHERE key = ?',
+                            ((key,) for key, value in self._cache_.items() 
+                             if value is None))
+        self.db.execute('REPLACE INTO lengths VALUES (?, ?)', 
+                        (self.table, self._length_))
+        self._cache_.clear()
+        
 
+class CatalogueDiversity():
+    """
+    Richness and Shannon diversity of the items (such as authors or 
+    subjects) in the records of a catalogue dated up to every checkpoint 
+    (and in the whole catalogue), updated with new, replaced or deleted 
+    records in time proportional to the number of items changed.
+    The state (records, occurrences of every item per year and statistics)
+    can be saved and loaded between updates; a loaded state reads and
+    writes only the records and items that change.
+    """
+    def __init__(self, checkpoints=()):
+        """
         Parameters
         ----------
-        text : str 
-            input text.
+        checkpoints : iterable of int/float, optional
+            the dates where richness and diversity are evaluated. 
+            The default is ().
+        """
+        # the last checkpoint (inf) covers all records, including undated
+        self._checkpoints_ = np.r_[np.sort(np.asarray(checkpoints, 
+                                                      dtype=float)), np.inf]
+        self._records_ = dict()   # record id -> (year, tuple of items)
+        self._counts_ = dict()    # item -> {year: occurrences}
+        size = len(self._checkpoints_)
+        self._total_ = np.zeros(size, dtype=np.int64)
+        self._sum_ = np.zeros(size)   # sum of f * ln(f) for all items
+        self._richness_ = np.zeros(size, dtype=np.int64)
+        self._path_ = None   # the database the state was loaded from
+        
+    def __len__(self):
+        """
+        Returns
+        -------
+        int
+            number of records in the catalogue.
+        """
+        return len(self._records_)
+    
+    # number of occurrences of the item dated up to every checkpoint
+    def _occurrences_(self, item):
+        years = self._counts_.get(item)
+        if not years:
+            return np.zeros(len(self._checkpoints_), dtype=np.int64)
+        Y = np.fromiter(years.keys(), dtype=float, count=len(years))
+        F = np.fromiter(years.values(), dtype=np.int64, count=len(years))
+        order = np.argsort(Y)
+        cumulative = np.r_[0, np.cumsum(F[order])]
+        
+        return cumulative[np.searchsorted(Y[order], self._checkpoints_, 
+                                          side='right')]
+    
+    # recompute all statistics from the item counts
+    def _rebuild_(self):
+        I, Y, F = list(), list(), list()
+        for n, years in enumerate(self._counts_.values()):
+            I.extend([n] * len(years))
+            Y.extend(years.keys())
+            F.extend(years.values())
+        I, Y, F = np.array(I, dtype=np.int64), np.array(Y), np.array(F)
+        for k, checkpoint in enumerate(self._checkpoints_):
+            selected = Y <= checkpoint
+            f = np.bincount(I[selected], weights=F[selected])
+            self._total_[k] = f.sum()
+            self._sum_[k] = xlogy(f, f).sum()
+            self._richness_[k] = np.count_nonzero(f)
+    
+    def update(self, records=(), deleted=()):
+        """
+        Add, replace or delete records.
 
+        Parameters
+        ----------
+        records : iterable of (str, int/float, iterable)
+            identifier, year (None or nan if unknown) and items of every
+            new record (replacing the record with the same identifier, 
+            if any). The default is ().
+        deleted : iterable of str, optional
+            identifiers of the records removed (unknown identifiers 
+            are ignored). The default is ().
+        """
+        changes = dict()   # item -> {year: change in occurrences}
+        def change(year, items, delta):
+            for item in items:
+                years = changes.setdefault(item, dict())
+                years[year] = years.get(year, 0) + delta
+            
+        for record_id in deleted:
+            if record_id in self._records_:
+                change(*self._records_.pop(record_id), -1)
+        for record_id, year, items in records:
+            year = np.inf if year is None or year != year else float(year)
+            if record_id in self._records_:
+                change(*self._records_[record_id], -1)
+            self._records_[record_id] = (year, tuple(items))
+            change(year, items, 1)
+        
+        # incremental updates unless many items change
+        incremental = len(changes) < len(self._counts_) // 4
+        for item, delta in changes.items():
+            if incremental:
+                before = self._occurrences_(item)
+            years = self._counts_.setdefault(item, dict())
+            for year, d in delta.items():
+                f = years.get(year, 0) + d
+                if f == 0:
+                    years.pop(year, None)
+                else:
+                    years[year] = f
+            if incremental:
+                after = self._occurrences_(item)
+                self._total_ += after - before
+                self._sum_ += xlogy(after, after) - xlogy(before, before)
+                self._richness_ += (after > 0).astype(int) - (before > 0)
+            if not years:
+                del self._counts_[item]
+        if not incremental:
+            self._rebuild_()
+            
+    # richness and diversity from totals and sums of f ln(f)
+    def _statistics_(self, k):
+        total = self._total_[k]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            D = np.exp(np.log(total) - self._sum_[k] / total)
+            
+        return self._richness_[k], np.where(total > 0, D, np.nan)
+        
+    def richness(self):
+        """
         Returns
         -------
-        list of str
-            list of tokens in text.
+        int
+            number of unique items in the catalogue.
+        """
+        return int(self._richness_[-1])
+    
+    def diversity(self):
+        """
+        Returns
+        -------
+        float
+            Shannon diversity index of the items in the catalogue.
         """
-        return Tokenizer.rex.findall(text)
+        return float(self._statistics_(-1)[1])
+    
+    def dr_rate(self):
+        """
+        Returns
+        -------
+        float
+            ratio between Shannon diversity and richness of the catalogue.
+        """
+        return self.diversity() / self.richness()
+    
+    def cumulative(self):
+        """
+        Returns
+        -------
+        tuple (numpy array of int, numpy array of float)
+            richness and diversity of the items dated up to every checkpoint, 
+            as returned by cumulative_diversity.
+        """
+        return self._statistics_(slice(None, -1))
+    
+    def save(self, path):
+        """
+        Store the catalogue in a sqlite database. If the state was loaded 
+        from path, only the records and items changed since then are
+        written; otherwise, the whole catalogue is written to a new file
+        (replaced atomically).
+
+        Parameters
+        ----------
+        path : str
+            the output file.
+        """
+        loaded = self._path_ == os.path.abspath(path)
+        if loaded:
+            db = self._records_.db
+            self._records_.flush()
+            self._counts_.flush()
+        else:
+            tmp = f'{path}.{os.getpid()}.tmp'
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            db = sqlite3.connect(tmp)
+            SQLiteDict.create(db, 'records', self._records_.items())
+            SQLiteDict.create(db, 'counts', self._counts_.items())
+        statistics = SQLiteDict(db, 'statistics')
+        statistics['checkpoints'] = self._checkpoints_[:-1]
+        statistics['total'] = self._total_
+        statistics['sum'] = self._sum_
+        statistics['richness'] = self._richness_
+        statistics.flush()
+        db.commit()
+        if not loaded:
+            db.close()
+            os.replace(tmp, path)
+    
+    @staticmethod
+    def load(path):
+        """
+        Parameters
+        ----------
+        path : str
+            a file written by CatalogueDiversity.save.
+
+        Returns
+        -------
+        CatalogueDiversity
+            the stored catalogue (records and item counts are read 
+            from the file when needed).
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        db = sqlite3.connect(path)
+        statistics = SQLiteDict(db, 'statistics')
+        state = CatalogueDiversity(statistics['checkpoints'])
+        state._total_ = statistics['total']
+        state._sum_ = statistics['sum']
+        state._richness_ = statistics['richness']
+        state._records_ = SQLiteDict(db, 'records')
+        state._counts_ = SQLiteDict(db, 'counts')
+        state._path_ = os.path.abspath(path)
+        
+        return state
     
 
 class Text():  
@@ -67,9 +1556,9 @@ class Text():
     Read a text file and compute diversity
     """        
     @staticmethod
-    def read_file(path):
+    def open_file(path):
         """
-        Red the content of a text file
+        Open a text file for reading
     
         Parameters
         ----------
@@ -83,18 +1572,177 @@ class Text():
     
         Returns
         -------
-        str
-           The content in the text file.
+        file object
+           The text stream.
     
         """
         if path.endswith('gz'):
-            return gzip.open(path, 'rt', encoding='utf-8').read()
+            return gzip.open(path, 'rt', encoding='utf-8')
         elif path.endswith('zip') :
-            raise NotImplementedError('zip format not yet implemented')              
+            raise NotImplementedError('zip archives cannot be opened as a stream')              
+        else:
+            return open(path, 'r')
+        
+    @staticmethod
+    def read_file(path):
+        """
+        Red the content of a text file
+    
+        Parameters
+        ----------
+        path : str
+            the path to the input file.
+    
+        Returns
+        -------
+        str
+           The content in the text file 
+           (all members, one after another, for zip archives).
+    
+        """
+        if path.endswith('zip'):
+            return '\n'.join(content for _, content in Corpus(path))
+        
+        with Text.open_file(path) as file:
+            return file.read()
+        
+    @staticmethod
+    def tokenize(content, lowercase=True):
+        """
+        Parameters
+        ----------
+        content : str
+            The input text.
+        lowercase : boolean, optional
+            Transform all tokens into lowercase if True. The default is True.
+
+        Returns
+        -------
+        list of str
+            list of tokens in text.
+        """
+        if lowercase:
+            return list(map(str.lower, Tokenizer.split(content)))
         else:
-            return open(path, 'r').read()
+            return Tokenizer.split(content)
+    
+    @classmethod
+    def from_ids(cls, ids, vocabulary):
+        """
+        Create an encoded text from token identifiers without copying them
+
+        Parameters
+        ----------
+        ids : numpy array of int
+            the token identifiers (it may be a view of a larger array).
+        vocabulary : list of str
+            the token types indexed by identifier 
+            (possibly shared with other texts).
+
+        Returns
+        -------
+        Text
+            An encoded text.
+        """
+        text = cls.__new__(cls)
+        text._tokens_ = None
+        text._counter_ = None
+        text._vocabulary_ = vocabulary
+        text._ids_ = ids
+        text._counts_ = np.bincount(ids, minlength=len(vocabulary))
+        
+        return text
+    
+    def _type_ids_(self):
+        """
+        Returns
+        -------
+        numpy array of int
+            identifiers of the token types in encoded text,
+            in order of first occurrence.
+        """
+        first = first_occurrences(self._ids_, len(self._vocabulary_))
+        present = np.flatnonzero(first < len(self._ids_))
+        
+        return present[np.argsort(first[present])]
+    
+    @classmethod
+    def from_stream(cls, path, step=0, lowercase=True, chunk_size=2**20):
+        """
+        Read the specified file (text or gzipped text) in chunks 
+        and store only token counts, so that memory is bounded by the 
+        size of the vocabulary. Step curves must be requested in advance,
+        since tokens are not kept.
+
+        Parameters
+        ----------
+        path : str
+            The full filename.
+        step : int, optional
+            if step > 0 compute also the step curves 
+            (token_richness, dict_size and token_diversity) for this step.
+            The default is 0.
+        lowercase : boolean, optional
+            Transform all tokens into lowercase if True. The default is True.
+        chunk_size : int, optional
+            number of characters read at once. The default is 2**20.
+
+        Returns
+        -------
+        Text
+            A text without tokens (tokens() is not available).
+        """
+        acc = RunningDiversity()
+        richness = dict()
+        diversity = dict()
+        with Text.open_file(path) as file:
+            tokens = Tokenizer.stream(file, chunk_size)
+            if lowercase:
+                tokens = map(str.lower, tokens)
+            for n, token in enumerate(tokens, 1):
+                acc.add(token)
+                if step > 0 and n % step == 0:
+                    richness[n] = acc.richness()
+                    diversity[n] = acc.diversity()
+            
+        if step > 0:
+            richness[n] = acc.richness()
+            diversity[n] = acc.diversity()
+        
+        text = cls.__new__(cls)
+        text._tokens_ = None
+        text._ids_ = None
+        text._counter_ = acc._counter_
+        text._length_ = len(acc)
+        text._curves_ = {step: (richness, diversity)} 
+        
+        return text
+    
+    def _streamed_curve_(self, step, kind):
+        """
+        Parameters
+        ----------
+        step : int
+            the sampling interval.
+        kind : int
+            0 for richness, 1 for diversity.
+
+        Raises
+        ------
+        ValueError
+            If the text was not streamed with the same step.
+
+        Returns
+        -------
+        dict
+            step curve computed while reading the stream.
+        """
+        if step not in self._curves_:
+            raise ValueError(f'Step curve {step} not computed when streaming')
+        
+        return self._curves_[step][kind]
     
-    def __init__(self, path, lowercase=True):
+    def __init__(self, path, lowercase=True, encoded=False, cache=None):
         """
         Read the specified file (text or gzipped text)
 
@@ -104,18 +1752,45 @@ class Text():
             The full filename.
         lowercase : boolean, optional
             Transform all tokens into lowercase if True. The default is True.
+        encoded : boolean, optional
+            Store tokens as an array of integer identifiers 
+            (indices in the text vocabulary) and their counts as an array 
+            instead of a list of str and a Counter. The default is False.
+        cache : TokenCache, optional
+            Reuse (or save) the tokenization stored in this cache.
+            The default is None.
         """
         if os.path.exists(path):
             content = Text.read_file(path)
         else:
             content = path
         
-        if lowercase:
-            self._tokens_ = list(map(str.lower, Tokenizer.split(content)))
+        if cache is not None:
+            key = cache.key(content, lowercase)
+            encoding = cache.load(key)
+            if encoding is None:
+                encoding = encode(Text.tokenize(content, lowercase))
+                cache.save(key, *encoding)
+            if encoded:
+                tokens = None
+            else:
+                vocabulary, ids = encoding
+                tokens = list(map(vocabulary.__getitem__, ids.tolist()))
         else:
-            self._tokens_ = Tokenizer.split(content)
-    
-        self._counter_ = Counter(self._tokens_)
+            tokens = Text.tokenize(content, lowercase)
+        
+        if encoded:
+            if tokens is not None:
+                encoding = encode(tokens)
+            self._vocabulary_, self._ids_ = encoding
+            self._counts_ = np.bincount(self._ids_, 
+                                        minlength=len(self._vocabulary_))
+            self._tokens_ = None
+            self._counter_ = None
+        else:
+            self._tokens_ = tokens
+            self._counter_ = Counter(self._tokens_)
+            self._ids_ = None
         
     def __len__(self):
         """
@@ -124,7 +1799,12 @@ class Text():
         int
             number of tokens in text.
         """
-        return len(self._tokens_)
+        if self._ids_ is not None:
+            return len(self._ids_)
+        elif self._tokens_ is None:
+            return self._length_
+        else:
+            return len(self._tokens_)
     
     def tokens(self):
         """
@@ -133,7 +1813,12 @@ class Text():
         list of str
             list of tokens in text.
         """
-        return self._tokens_
+        if self._ids_ is not None:
+            return list(map(self._vocabulary_.__getitem__, self._ids_.tolist()))
+        elif self._tokens_ is None:
+            raise ValueError('Tokens are not stored in streamed texts')
+        else:
+            return self._tokens_
     
     def types(self):
         """
@@ -143,7 +1828,11 @@ class Text():
         list of str
             list of token types (unique tokens) in text.
         """
-        return list(self._counter_.keys())
+        if self._ids_ is not None:
+            return list(map(self._vocabulary_.__getitem__, 
+                            self._type_ids_().tolist()))
+        else:
+            return list(self._counter_.keys())
     
     
     @staticmethod
@@ -166,6 +1855,28 @@ class Text():
         return 2 ** entropy
 
     
+    def counts(self):
+        """
+        Returns
+        -------
+        numpy array of int
+            number of occurrences of every token type, in the order of types().
+        """
+        if self._ids_ is not None:
+            return self._counts_[self._type_ids_()]
+        else:
+            return np.array(list(self._counter_.values()))
+    
+    def summary(self):
+        """
+        Returns
+        -------
+        CountSummary
+            mergeable summary of the token counts in text.
+        """
+        return CountSummary.from_counts(dict(zip(self.types(), 
+                                                 self.counts().tolist())))
+    
     # return list of hapax legomena in text 
     # 
     def hapax_legomena(self):
@@ -177,7 +1888,12 @@ class Text():
         list of str
             list of tokens with a single occurence in text.
         """
-        return [k for k, v in self._counter_.items() if v == 1]
+        if self._ids_ is not None:
+            types = self._type_ids_()
+            hapax = types[self._counts_[types] == 1]
+            return [self._vocabulary_[k] for k in hapax.tolist()]
+        else:
+            return [k for k, v in self._counter_.items() if v == 1]
     
  
     def hapax_legomena_rate(self):
@@ -210,17 +1926,12 @@ class Text():
         """
         if step == 0:
             return len(self.types())   
+        elif self._ids_ is not None:
+            return sample(richness_curve(self._ids_), step)
+        elif self._tokens_ is None:
+            return self._streamed_curve_(step, 0)
         else:
-            stats = dict()
-            token_types = set()
-            for n, token in enumerate(self._tokens_, 1):
-                token_types.add(token)
-                if n % step == 0:
-                    stats[n] = len(token_types)
-            
-            stats[n] = len(token_types)
-            
-            return stats
+            return sample(richness_curve(encode(self._tokens_)[1]), step)
         
     def token_diversity(self, step = 0):
         """
@@ -241,20 +1952,147 @@ class Text():
             of length = step.
         """
         if step == 0:
-            return Text._diversity_(self._counter_.values())
+            if self._ids_ is not None:
+                counts = self._counts_[self._type_ids_()]
+                return Text._diversity_(counts.tolist())
+            else:
+                return Text._diversity_(self._counter_.values())
+        elif self._ids_ is not None:
+            return sample(diversity_curve(self._ids_), step)
+        elif self._tokens_ is None:
+            return self._streamed_curve_(step, 1)
         else:
-            c = Counter()
+            acc = RunningDiversity()
             stats = dict()
             for n, token in enumerate(self._tokens_, 1):
-                c[token] += 1
+                acc.add(token)
                 if n % step == 0:
-                    stats[n] = Text._diversity_(c.values())
+                    stats[n] = acc.diversity()
             
-            stats[n] = Text._diversity_(c.values())
+            stats[n] = acc.diversity()
             
             return stats
     
    
+    def hill_numbers(self, orders=(0, 1, 2), step=0):
+        """
+        Compute Hill numbers of several orders for the token types in text 
+
+        Parameters
+        ----------
+        orders : iterable of float, optional
+            the orders q (0 for richness, 1 for Shannon diversity,
+            2 for inverse Simpson index). The default is (0, 1, 2).
+        step : int, optional
+             if step > 0 return the Hill numbers after n tokens
+             with n a multiple of step (or the total number of tokens in text). 
+             The default is 0.
+
+        Returns
+        -------
+        dict 
+            the Hill number for every order q if step = 0;
+            for every order q, the Hill numbers evaluated at regular 
+            intervals of length = step, otherwise.
+        """
+        orders = tuple(orders)
+        if step == 0:
+            if self._ids_ is not None:
+                counts = self._counts_
+            else:
+                counts = list(self._counter_.values())
+            return dict(zip(orders, hill_numbers(counts, orders).tolist()))
+        else:
+            if self._ids_ is not None:
+                ids = self._ids_
+            else:
+                ids = encode(self.tokens())[1]
+            curves = hill_curves(ids, orders)
+            return {q: sample(curves[:, k], step) for k, q in enumerate(orders)}
+    
+    def rarefaction(self, step, permutations=0, seed=None):
+        """
+        Compute rarefaction curves: the expected richness and diversity 
+        of n tokens taken at random from text.
+
+        Parameters
+        ----------
+        step : int
+            evaluate the curves after n tokens with n a multiple of step 
+            (or the total number of tokens in text).
+        permutations : int, optional
+            if 0 compute the exact expected values (hypergeometric 
+            rarefaction), otherwise the average over this number of random 
+            permutations of the tokens. The default is 0.
+        seed : int, optional
+            seed for the random permutations. The default is None.
+
+        Returns
+        -------
+        tuple (dict of floats, dict of floats)
+            richness and diversity evaluated at regular intervals 
+            of length = step.
+        """
+        if self._ids_ is not None:
+            counts = self._counts_
+        else:
+            counts = list(self._counter_.values())
+        sizes = list(sample(np.arange(len(self)), step))
+        if permutations == 0:
+            R, D = rarefaction(counts, sizes)
+        else:
+            R, D = rarefaction_mc(counts, sizes, permutations, seed)
+        
+        return dict(zip(sizes, R.tolist())), dict(zip(sizes, D.tolist()))
+    
+    def window_diversity(self, window, stride=1):
+        """
+        Compute the diversity of token types in a moving window 
+
+        Parameters
+        ----------
+        window : int
+            number of tokens in the window.
+        stride : int, optional
+            number of tokens the window moves forward between evaluations. 
+            The default is 1.
+
+        Returns
+        -------
+        dict of floats
+            Shannon diversity index of tokens[n - window:n] 
+            with n = window, window + stride, window + 2 * stride...
+            (and n = the total number of tokens in text); 
+            empty if the text is shorter than the window.
+            
+        Raises
+        ------
+        ValueError
+            If window or stride are smaller than 1.
+        """
+        if window < 1 or stride < 1:
+            raise ValueError('Window and stride must be positive', 
+                             window, stride)
+        if len(self) < window:
+            return dict()
+        if self._ids_ is not None:
+            items = self._ids_.tolist()
+        else:
+            items = self.tokens()
+        
+        acc = RunningDiversity()
+        stats = dict()
+        for n, token in enumerate(items, 1):
+            acc.add(token)
+            if n > window:
+                acc.remove(items[n - window - 1])
+            if n >= window and (n - window) % stride == 0:
+                stats[n] = acc.diversity()
+        
+        stats[n] = acc.diversity()
+        
+        return stats
+   
     def dict_size(self, step = 0):
         """
         Compute the dictionary size (number of token types) in the text.
@@ -274,19 +2112,253 @@ class Text():
              of length = step, otherwise
         """
         if step == 0:
-            return len(self._counter_)
+            if self._ids_ is not None:
+                return int(np.count_nonzero(self._counts_))
+            else:
+                return len(self._counter_)
         else:
-            c = Counter()
-            stats = dict()
-            for n, token in enumerate(self._tokens_, 1):
-                c[token.lower()] += 1
-                if n % step == 0:
-                    stats[n] = len(c)
-                    
-            stats[n] = len(c)
-            
-            return stats
+            return self.token_richness(step)
+    
+
+def _process_(task):
+    """
+    Apply a function to one text in a corpus (executed by worker processes)
+    """
+    corpus, name, function, args = task
+    
+    return function(Text(corpus.read(name), **args))
+
+
+class Corpus():
+    """
+    A collection of texts: the members of a zip archive or 
+    the files in a folder whose path matches a regular expression
+    """
+    def __init__(self, source, pattern='.*'):
+        """
+        Parameters
+        ----------
+        source : str
+            path to a zip archive or to the root folder.
+        pattern : str, optional
+            a regular expression selecting the members or files. 
+            The default is '.*'.
+        """
+        self.source = source
+        if source.endswith('zip'):
+            with zipfile.ZipFile(source, 'r') as archive:
+                names = [name for name in archive.namelist() 
+                         if not name.endswith('/')]
+            self.names = list(filter(re.compile(pattern).fullmatch, names))
+        else:
+            self.names = select(pattern, source)
+    
+    def __len__(self):
+        """
+        Returns
+        -------
+        int
+            number of texts in the corpus.
+        """
+        return len(self.names)
+    
+    def __iter__(self):
+        """
+        Yields
+        ------
+        tuple (str, str)
+            name and content of every text, in archive (or path) order.
+        """
+        for name in self.names:
+            yield name, self.read(name)
+    
+    def read(self, name):
+        """
+        Parameters
+        ----------
+        name : str
+            the name of a member in the archive (or path of a file).
+
+        Returns
+        -------
+        str
+            the content of the text.
+        """
+        if self.source.endswith('zip'):
+            with zipfile.ZipFile(self.source, 'r') as archive:
+                return archive.open(name).read().decode('UTF-8')
+        else:
+            return Text.read_file(name)
+    
+    def imap(self, function, processes=None, **args):
+        """
+        Apply a function to every text in the corpus using a pool of processes
+        and yield the results as soon as they are available (in archive order).
+        Parameters are the same as for Corpus.map.
+
+        Yields
+        ------
+        tuple (str, object)
+            name and function value for every text, in archive order.
+        """
+        tasks = [(self, name, function, args) for name in self.names]
+        if processes == 1:
+            yield from zip(self.names, map(_process_, tasks))
+        else:
+            with Pool(processes) as pool:
+                yield from zip(self.names, 
+                               pool.imap(_process_, tasks, chunksize=1))
+    
+    def map(self, function, processes=None, **args):
+        """
+        Apply a function to every text in the corpus using a pool of processes
+
+        Parameters
+        ----------
+        function : callable
+            a (picklable) function with a Text as argument, 
+            for example, functools.partial(Text.token_diversity, step=1000).
+        processes : int, optional
+            number of worker processes; 1 for serial processing. 
+            The default is None (the number of CPUs).
+        **args : 
+            optional parameters to be passed to the Text constructor.
+
+        Returns
+        -------
+        list of (str, object)
+            name and function value for every text, in archive order.
+        """
+        return list(self.imap(function, processes, **args))
+
+
+def _encoding_(text):
+    """
+    Returns
+    -------
+    tuple (list of str, numpy array of uint32)
+        vocabulary and token identifiers of an encoded text.
+    """
+    return text._vocabulary_, text._ids_
+
+
+class CorpusStore():
+    """
+    Tokens of many texts stored in a folder as a single memory-mapped array 
+    of identifiers (ids.bin), with an index of document offsets 
+    (offsets.npy), the document names (names.txt) and the vocabulary 
+    shared by all documents (vocabulary.txt).
+    """
+    @staticmethod
+    def build(folder, corpus, processes=None, **args):
+        """
+        Tokenize all texts in a corpus and save them as a corpus store
+
+        Parameters
+        ----------
+        folder : str
+            The output folder (created if needed).
+        corpus : Corpus
+            The input texts.
+        processes : int, optional
+            number of worker processes used for tokenization. 
+            The default is None (the number of CPUs).
+        **args : 
+            optional parameters to be passed to the Text constructor 
+            (such as lowercase or cache).
+
+        Returns
+        -------
+        CorpusStore
+            the store in folder.
+        """
+        os.makedirs(folder, exist_ok=True)
+        index = dict()
+        offsets = [0]
+        args['encoded'] = True
+        with open(os.path.join(folder, 'ids.bin'), 'wb') as target:
+            for _, (vocabulary, ids) in corpus.imap(_encoding_, processes, 
+                                                    **args):
+                mapping = [index.setdefault(t, len(index)) for t in vocabulary]
+                np.array(mapping, dtype=np.uint32)[ids].tofile(target)
+                offsets.append(offsets[-1] + len(ids))
+        
+        np.save(os.path.join(folder, 'offsets.npy'), np.array(offsets))
+        with open(os.path.join(folder, 'names.txt'), 'w', 
+                  encoding='utf-8') as target:
+            target.writelines(f'{name}\n' for name in corpus.names)
+        with open(os.path.join(folder, 'vocabulary.txt'), 'w', 
+                  encoding='utf-8') as target:
+            target.writelines(f'{token}\n' for token in index)
+        
+        return CorpusStore(folder)
+    
+    def __init__(self, folder):
+        """
+        Open a corpus store created with CorpusStore.build
+
+        Parameters
+        ----------
+        folder : str
+            The folder containing the store.
+        """
+        self.folder = folder
+        self.offsets = np.load(os.path.join(folder, 'offsets.npy'))
+        with open(os.path.join(folder, 'names.txt'), 
+                  encoding='utf-8') as source:
+            self.names = source.read().splitlines()
+        with open(os.path.join(folder, 'vocabulary.txt'), 
+                  encoding='utf-8') as source:
+            self.vocabulary = source.read().splitlines()
+        if self.offsets[-1] > 0:
+            self.ids = np.memmap(os.path.join(folder, 'ids.bin'), 
+                                 dtype=np.uint32, mode='r')
+        else:
+            self.ids = np.zeros(0, dtype=np.uint32)
+        
+    def __len__(self):
+        """
+        Returns
+        -------
+        int
+            number of documents in the store.
+        """
+        return len(self.names)
+    
+    def tokens(self, doc, start=0, stop=None):
+        """
+        Parameters
+        ----------
+        doc : int or str
+            the document position or name.
+        start : int, optional
+            first token in the slice. The default is 0.
+        stop : int, optional
+            end of the slice. The default is None (the document end).
+
+        Returns
+        -------
+        numpy array of uint32
+            the token identifiers (a view of the memory-mapped array) 
+            in a slice of the document.
+        """
+        if isinstance(doc, str):
+            doc = self.names.index(doc)
+        begin, end = self.offsets[doc], self.offsets[doc + 1]
+        
+        return self.ids[begin:end][start:stop]
     
+    def text(self, doc, start=0, stop=None):
+        """
+        Parameters are the same as for CorpusStore.tokens.
+
+        Returns
+        -------
+        Text
+            an encoded text sharing the store tokens and vocabulary.
+        """
+        return Text.from_ids(self.tokens(doc, start, stop), self.vocabulary)
+        
 
 class BestFit(object):
     """
@@ -372,6 +2444,102 @@ class BestFit(object):
         """
         return a * x + b
     
+    def jacobian_exp2(x, yM, xmid):
+        """
+        Partial derivatives of exp2 with respect to yM and xmid
+        """
+        e = np.exp(x * log(0.5) / xmid)
+        
+        return np.column_stack((1 - e, yM * e * x * log(0.5) / xmid ** 2))
+    
+    def jacobian_bio_model2(x, yM, b):
+        """
+        Partial derivatives of bio_model2 with respect to yM and b
+        """
+        return np.column_stack((x / (x + b), -yM * x / (x + b) ** 2))
+    
+    def jacobian_bio_model3(x, yM, b, c):
+        """
+        Partial derivatives of bio_model3 with respect to yM, b and c
+        """
+        return np.column_stack(((x + b) / (x + c), 
+                                yM / (x + c), 
+                                -yM * (x + b) / (x + c) ** 2))
+    
+    def jacobian_power(x, yM, alpha, c):
+        """
+        Partial derivatives of power with respect to yM, alpha and c
+        """
+        r = x / (x + c)
+        ra = r ** alpha
+        
+        return np.column_stack((ra, yM * ra * np.log(r), 
+                                -yM * alpha * ra / (x + c)))
+    
+    def jacobian_simple_power(x, C, alpha):
+        """
+        Partial derivatives of simple_power with respect to C and alpha
+        """
+        xa = x ** alpha
+        
+        return np.column_stack((xa, C * xa * np.log(x)))
+    
+    def jacobian_linear(x, a, b):
+        """
+        Partial derivatives of linear with respect to a and b
+        """
+        return np.column_stack((x, np.ones_like(x)))
+    
+    jacobians = {
+        'exp2': jacobian_exp2,
+        'bio_model2': jacobian_bio_model2,
+        'bio_model3': jacobian_bio_model3,
+        'power': jacobian_power,
+        'simple_power': jacobian_simple_power,
+        'linear': jacobian_linear
+        }
+    
+    def linearized_simple_power(X, Y):
+        """
+        Least squares fit of log(Y) = log(C) + alpha log(X), weighted by Y 
+        to approximate the residuals of the original model
+        """
+        alpha, logC = np.polyfit(np.log(X), np.log(Y), 1, w=Y)
+        
+        return np.array((np.exp(logC), alpha))
+    
+    def linearized_zipf(X, Y):
+        """
+        Least squares fit of log(Y) = log(C) - alpha log(X), weighted by Y
+        """
+        slope, logC = np.polyfit(np.log(X), np.log(Y), 1, w=Y)
+        
+        return np.array((np.exp(logC), -slope))
+    
+    def linearized_bio_model2(X, Y):
+        """
+        Least squares fit of the Hanes-Woolf linearization X / Y = (X + b) / yM
+        (better conditioned than the Lineweaver-Burk double reciprocal)
+        """
+        slope, intercept = np.polyfit(X, X / Y, 1)
+        
+        return np.array((1 / slope, intercept / slope))
+    
+    def linearized_linear(X, Y):
+        """
+        Least squares fit of the linear model (exact solution)
+        """
+        return np.polyfit(X, Y, 1)
+    
+    # closed-form approximations, and models for which they are exact
+    linearizations = {
+        'simple_power': linearized_simple_power,
+        'zipf': linearized_zipf,
+        'bio_model2': linearized_bio_model2,
+        'linear': linearized_linear
+        }
+    exact = ('linear',)
+    
     def __init__(self, name='exp1'):
         """
         Create object to identify optimal parameters for the sepecified function.
@@ -392,11 +2560,47 @@ class BestFit(object):
             self.params = None
         except AttributeError:
             raise NotImplementedError(name)
+        self.name = name
+        self.jac = BestFit.jacobians.get(name)
         
   
-    def fit(self, X, Y, **args):
+    def _fit_(self, X, Y, p0, refine, args):
+        """
+        Returns
+        -------
+        tuple (array of float, array of float)
+            best fit parameters and their covariance.
+        """
+        linearization = BestFit.linearizations.get(self.name)
+        if linearization is not None and (p0 is None or not refine):
+            X = np.asarray(X, dtype=float)
+            Y = np.asarray(Y, dtype=float)
+            with np.errstate(all='ignore'):
+                start = linearization(X, Y)
+            if self.name in BestFit.exact and not args:
+                # covariance estimated as in curve_fit
+                J = self.jac(X, *start)
+                residuals = Y - self.func(X, *start)
+                s2 = np.dot(residuals, residuals) / max(len(X) - len(start), 1)
+                return start, np.linalg.pinv(J.T @ J) * s2
+            elif not refine:
+                return start, np.full((len(start), len(start)), np.nan)
+            elif np.all(np.isfinite(start)):
+                if 'bounds' in args:
+                    start = np.clip(start, *args['bounds'])
+                p0 = start
+        
+        if self.jac is not None:
+            args.setdefault('jac', self.jac)
+        
+        return curve_fit(self.func, X, Y, p0=p0, **args)[:2]
+    
+    def fit(self, X, Y, refine=True, **args):
         """
-        Compute the best fit parameters      
+        Compute the best fit parameters. For the models in 
+        BestFit.linearizations, if no initial parameters p0 are given,
+        the fit starts from the closed-form solution of a linearized 
+        problem (which is already the solution for the linear model).
 
         Parameters
         ----------
@@ -404,8 +2608,12 @@ class BestFit(object):
             x-values.
         Y : array of float
             y-values.
+        refine : boolean, optional
+            if False return the closed-form (linearized) solution 
+            for the models which have one. The default is True.
         **args : params
             optional parameters to be passed to scipy.optimize.curve_fit.
+            The analytic Jacobian is used for the models which have one.
 
         Returns
         -------
@@ -413,11 +2621,140 @@ class BestFit(object):
             DESCRIPTION.
 
         """
-        self.params = curve_fit(self.func, X, Y, **args)[0]
+        p0 = args.pop('p0', None)
+        self.params = self._fit_(X, Y, p0, refine, args)[0]
         
         return self.params
     
+    def fit_many(self, series, p0=None, warm_start=True, processes=1, 
+                 refine=True, **args):
+        """
+        Fit the model to many series of data points. Failed fits do not 
+        raise exceptions but are reported in a mask.
+
+        Parameters
+        ----------
+        series : iterable of (array of float, array of float)
+            the (X, Y) values of every series.
+        p0 : array of float, optional
+            initial parameters. The default is None (all ones).
+        warm_start : boolean, optional
+            start every fit from the solution of the previous successful fit
+            (models with a closed-form approximation start from it instead, 
+            unless p0 is given). The default is True.
+        processes : int, optional
+            number of worker processes, each one fitting a contiguous block 
+            of series; None for the number of CPUs. The default is 1.
+        refine : boolean, optional
+            if False return the closed-form (linearized) solutions 
+            for the models which have one. The default is True.
+        **args : params
+            optional parameters to be passed to scipy.optimize.curve_fit.
+
+        Returns
+        -------
+        tuple (array of float, array of float, array of bool)
+            the parameters of every series (one row per series, nan if 
+            the fit failed), their covariance matrices and the failure mask.
+        """
+        series = list(series)
+        if processes != 1 and series:
+            processes = processes or os.cpu_count()
+            size = -(-len(series) // processes)
+            tasks = [(self.name, series[start:start + size], 
+                      p0, warm_start, refine, args)
+                     for start in range(0, len(series), size)]
+            with Pool(processes) as pool:
+                results = pool.map(_fit_many_, tasks)
+            return tuple(np.concatenate(r) for r in zip(*results))
+        
+        k = self.func.__code__.co_argcount - 1
+        params = np.full((len(series), k), np.nan)
+        covariances = np.full((len(series), k, k), np.nan)
+        failed = np.zeros(len(series), dtype=bool)
+        if warm_start and self.name in BestFit.linearizations:
+            warm_start = p0 is not None
+        start = p0
+        for n, (X, Y) in enumerate(series):
+            if len(X) < k:
+                # too few points to determine the parameters
+                failed[n] = True
+                continue
+            try:
+                params[n], covariances[n] = self._fit_(X, Y, start, refine, 
+                                                       dict(args))
+                if warm_start:
+                    start = params[n]
+            except (RuntimeError, ValueError):
+                failed[n] = True
+        
+        return params, covariances, failed
+    
    
+    @staticmethod
+    def select(X, Y, models, criterion='aic', train=0.5, processes=1):
+        """
+        Fit several models to the same data points and rank them
+
+        Parameters
+        ----------
+        X : array of float
+            x-values.
+        Y : array of float
+            y-values.
+        models : dict or iterable of str
+            the model names, or a dictionary with the optional parameters 
+            for scipy.optimize.curve_fit (such as p0 or bounds) of every model.
+        criterion : str, optional
+            'aic' (Akaike information criterion), 'bic' (Bayesian 
+            information criterion) or 'extrapolation' (root mean squared 
+            error on the points not used for fitting). The default is 'aic'.
+        train : int or float, optional
+            for the extrapolation criterion, the number (int) or the fraction
+            (float) of initial points used to fit the models. 
+            The default is 0.5.
+        processes : int, optional
+            number of worker processes (one model each); None for the 
+            number of CPUs. The default is 1.
+
+        Raises
+        ------
+        NotImplementedError
+            If the criterion has not been implemented.
+        ValueError
+            If no points remain to evaluate the extrapolation.
+
+        Returns
+        -------
+        list of (str, float, array of float)
+            name, score and best fit parameters of every model, 
+            from best (lowest score) to worst. 
+            Failed fits get an infinite score and None parameters
+            (exact fits get minus infinity with AIC or BIC).
+        """
+        if criterion not in ('aic', 'bic', 'extrapolation'):
+            raise NotImplementedError(criterion)
+        if not isinstance(models, dict):
+            models = {name: dict() for name in models}
+        X = np.asarray(X, dtype=float)
+        Y = np.asarray(Y, dtype=float)
+        if criterion == 'extrapolation':
+            m = train if isinstance(train, int) else int(round(train * len(X)))
+            if m >= len(X):
+                raise ValueError('No points left to evaluate extrapolation', 
+                                 train, len(X))
+        else:
+            m = len(X)
+        tasks = [(name, X, Y, args, criterion, m) 
+                 for name, args in models.items()]
+        if processes == 1:
+            scores = [_score_(task) for task in tasks]
+        else:
+            with Pool(processes) as pool:
+                scores = pool.map(_score_, tasks)
+        
+        return sorted(scores, key=lambda s: s[1])
+    
     def f(self, X, *params):
         """
         Parameters
@@ -438,6 +2775,39 @@ class BestFit(object):
         else:
             return self.f(X, *self.params)
 
+def _fit_many_(task):
+    """
+    Fit a block of series (executed by worker processes)
+    """
+    name, series, p0, warm_start, refine, args = task
+    
+    return BestFit(name).fit_many(series, p0, warm_start, 1, refine, **args)
+
+def _score_(task):
+    """
+    Fit a model and compute its score for BestFit.select
+    """
+    name, X, Y, args, criterion, m = task
+    try:
+        bf = BestFit(name)
+        params = bf.fit(X[:m], Y[:m], **args)
+    except (RuntimeError, ValueError):
+        return name, np.inf, None
+    
+    residuals = Y - bf.f(X, *params)
+    n, k = m, len(params)
+    if criterion == 'extrapolation':
+        score = np.sqrt(np.mean(residuals[m:] ** 2))
+    else:
+        rss = np.dot(residuals, residuals)
+        penalty = 2 * k if criterion == 'aic' else k * log(n)
+        # an exact fit gets the lowest possible score
+        score = n * log(rss / n) + penalty if rss != 0 else -np.inf
+    if np.isnan(score):
+        return name, np.inf, None
+    
+    return name, float(score), params
+
 def richness(items):
     """
     Parameters
@@ -472,6 +2842,39 @@ def shannon_diversty_index(items):
 
     return 2 ** entropy
 
+def cumulative_diversity(years, items, checkpoints):
+    """
+    Richness and Shannon diversity of the items dated up to every checkpoint,
+    computed in a single pass over the items sorted by date.
+
+    Parameters
+    ----------
+    years : iterable of int/float
+        the date of every item.
+    items : iterable
+        a collection of repeatable elements (as many as years).
+    checkpoints : iterable of int/float
+        the dates where richness and diversity are evaluated.
+
+    Returns
+    -------
+    tuple (numpy array of int, numpy array of float)
+        richness and diversity of the items with year <= checkpoint, 
+        for every checkpoint (0 and nan if there are no such items).
+    """
+    years = np.asarray(years, dtype=float)
+    ids = encode(items)[1]
+    order = np.argsort(years, kind='stable')
+    ids = ids[order]
+    years = years[order]
+    # number of items dated up to every checkpoint
+    n = np.searchsorted(years, np.asarray(checkpoints, dtype=float), 
+                        side='right')
+    R = np.r_[0, richness_curve(ids)][n]
+    D = np.r_[np.nan, diversity_curve(ids)][n]
+    
+    return R, D
+
 def dr_rate(items):
     """
     Parameters
@@ -485,7 +2888,10 @@ def dr_rate(items):
         ratio between Shannon diversity and richness of the collection.
 
     """
-    return shannon_diversty_index(items) / richness(items)
+    frequencies = list(Counter(items).values())
+    q0, q1 = hill_numbers(frequencies, (0, 1))
+    
+    return q1 / q0
 
 
         
\ No newline at end of file
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Richness and Shannon diversity of the classes and properties used by
+linked open data collections, streamed from files named host-class.txt
+and host-property.txt with one line per resource: <resource> <count>
+
+@author: UA - DLSI - RCC
+"""
+import os
+import re
+from math import log, exp
+from multiprocessing import Pool
+import numpy as np
+from scipy.special import xlogy
+
+
+def read_counts(path, chunk_size=2**24):
+    """
+    Read the counts in a resource file, in chunks of complete lines
+
+    Parameters
+    ----------
+    path : str
+        path to a file with lines <resource> <count>.
+    chunk_size : int, optional
+        number of bytes read at a time. The default is 2**24.
+
+    Yields
+    ------
+    numpy array of int
+        the counts (last field) in the lines of every chunk.
+    """
+    with open(path, 'rb') as file:
+        rest = b''
+        while True:
+            block = file.read(chunk_size)
+            data = rest + block
+            if block:
+                end = data.rfind(b'\n') + 1
+                data, rest = data[:end], data[end:]
+            fields = [line.rsplit(None, 1)[-1] for line in data.splitlines()
+                      if line.strip()]
+            if fields:
+                yield np.array(fields).astype(np.int64)
+            if not block:
+                break
+
+
+def resource_statistics(path, chunk_size=2**24):
+    """
+    Parameters
+    ----------
+    path : str
+        path to a file with lines <resource> <count> (one per resource).
+    chunk_size : int, optional
+        number of bytes read at a time. The default is 2**24.
+
+    Returns
+    -------
+    tuple (int, float)
+        richness (number of resources) and Shannon diversity index,
+        accumulated chunk by chunk.
+    """
+    richness, total, flogf = 0, 0, 0.0
+    for counts in read_counts(path, chunk_size):
+        richness += len(counts)
+        total += int(counts.sum())
+        flogf += xlogy(counts, counts).sum()
+    diversity = exp(log(total) - flogf / total) if total > 0 else float('nan')
+
+    return richness, diversity
+
+
+# statistics for one file (task is host, resource type, path and chunk size)
+def _process_(task):
+    host, resource_type, path, chunk_size = task
+    richness, diversity = resource_statistics(path, chunk_size)
+
+    return {'host': host,
+            'resource type': resource_type,
+            'richness': richness,
+            'diversity': diversity,
+            'rate': diversity / richness if richness > 0 else float('nan')}
+
+
+def lod_statistics(input_dir, processes=None, chunk_size=2**24):
+    """
+    Richness, diversity and diversity/richness rate of classes and
+    properties for every host, with the files processed in parallel
+
+    Parameters
+    ----------
+    input_dir : str
+        folder with files named host-class.txt and host-property.txt.
+    processes : int, optional
+        number of processes (all CPUs if None). The default is None.
+    chunk_size : int, optional
+        number of bytes read at a time. The default is 2**24.
+
+    Returns
+    -------
+    DataFrame
+        one row per host (uppercase) and columns (resource type, statistic).
+    """
+    import pandas as pd
+
+    tasks = list()
+    for filename in sorted(os.listdir(input_dir)):
+        m = re.fullmatch(r'(\w+)-(\w+)\.txt', filename)
+        if m and m.group(2) in ('class', 'property'):
+            path = os.path.join(input_dir, filename)
+            tasks.append((m.group(1).upper(), m.group(2), path, chunk_size))
+    with Pool(processes) as pool:
+        rows = pool.map(_process_, tasks)
+
+    res = pd.DataFrame(rows).set_index('host')
+    pivot = res.pivot_table(index=res.index, columns='resource type',
+                            values=('richness', 'diversity', 'rate'))
+
+    return pivot.swaplevel(0, 1, axis=1).sort_index(axis=1)